@@ -0,0 +1,51 @@
+from django.utils.module_loading import import_string
+
+
+class LazyView:
+    """
+    View function importing its view on first use, so loading URL configuration
+    does not import every view module with serializers and their dependencies.
+    Worker then imports only modules of the views it actually serves.
+    """
+
+    def __init__(self, view_path, **initkwargs):
+        self.view_path = view_path
+        self.initkwargs = initkwargs
+        self._view = None
+
+    def __repr__(self):
+        return f"<LazyView {self.view_path}>"
+
+    @property
+    def view(self):
+        """
+        Returns imported view function, class based views are converted by as_view
+        """
+        if self._view is None:
+            view = import_string(self.view_path)
+            self._view = view.as_view(**self.initkwargs) if hasattr(view, "as_view") else view
+        return self._view
+
+    @property
+    def view_class(self):
+        """
+        Returns imported view class or function, used for view names in metrics and logs
+        """
+        return getattr(self.view, "view_class", self.view)
+
+    @property
+    def csrf_exempt(self):
+        """
+        Returns whether CsrfViewMiddleware skips the view, checked before the view is called
+        """
+        return getattr(self.view, "csrf_exempt", False)
+
+    def __call__(self, request, *args, **kwargs):
+        return self.view(request, *args, **kwargs)  # pylint: disable=not-callable
+
+
+def lazy_view(view_path, **initkwargs):
+    """
+    Returns view function of the view given by dotted path, imported on first request
+    """
+    return LazyView(view_path, **initkwargs)
@@ -0,0 +1,154 @@
+import atexit
+import contextvars
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+request_context = contextvars.ContextVar("request_context", default=None)
+
+CONTEXT_FIELDS = ("request_id", "user_id", "view")
+RECORD_FIELDS = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Adds fields of the current request to log records
+    """
+
+    def filter(self, record):
+        context = request_context.get() or {}
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, context.get(field))
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats log records as one-line JSON objects including request context and extra fields
+    """
+
+    def format(self, record):
+        data = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RECORD_FIELDS and value is not None:
+                data[key] = value
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class QueueFileHandler(logging.Handler):
+    """
+    Puts records to a bounded in-memory queue which is written to file by a background thread,
+    so logging never blocks request threads on disk writes. Records that do not fit into
+    the queue are dropped and counted.
+
+    rotation: "watched" (default) reopens file rotated by external logrotate and is safe with many
+    worker processes, "size" rotates file by max_bytes and is only safe with a single process
+    writing the file, "none" never rotates.
+
+    Forked processes, e.g. workers of preloaded gunicorn application, start their own background thread.
+    """
+
+    def __init__(self, filename, rotation="watched", max_bytes=0, backup_count=0, queue_size=10000):
+        super().__init__()
+        if rotation == "size":
+            self.target = logging.handlers.RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+        elif rotation == "watched":
+            self.target = logging.handlers.WatchedFileHandler(filename, delay=True)
+        else:
+            self.target = logging.FileHandler(filename, delay=True)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._unreported_drops = 0
+        self._drops_lock = threading.Lock()
+        self.listener = None
+        self._listener_running = False
+        self.start_listener()
+        atexit.register(self.close)
+        os.register_at_fork(after_in_child=self.restart_listener)
+
+    def start_listener(self):
+        """
+        Starts background thread writing queued records to file
+        """
+        self.listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+        self._listener_running = True
+
+    def stop_listener(self):
+        """
+        Writes queued records and stops background thread
+        """
+        if self._listener_running:
+            self._listener_running = False
+            self.listener.stop()
+
+    def restart_listener(self):
+        """
+        Replaces queue and background thread in forked process, threads are not copied by fork
+        and the queue may hold records of the parent process
+        """
+        if not self._listener_running:
+            return
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self._drops_lock = threading.Lock()
+        self.start_listener()
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def setLevel(self, level):
+        super().setLevel(level)
+        self.target.setLevel(level)
+
+    def prepare(self, record):
+        """
+        Merges message arguments, so record does not depend on mutable objects after being queued.
+        Formatting is left to the background thread.
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def emit(self, record):
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            with self._drops_lock:
+                self.dropped += 1
+                self._unreported_drops += 1
+            return
+        if self._unreported_drops:
+            self.report_drops(record.name)
+
+    def report_drops(self, name):
+        """
+        Logs how many records were dropped since the last report
+        """
+        with self._drops_lock:
+            dropped, self._unreported_drops = self._unreported_drops, 0
+        record = logging.makeLogRecord(
+            {"name": name, "levelno": logging.WARNING, "levelname": "WARNING", "msg": f"{dropped} log records dropped"}
+        )
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._drops_lock:
+                self._unreported_drops += dropped
+
+    def close(self):
+        self.stop_listener()
+        self.target.close()
+        super().close()
@@ -0,0 +1,67 @@
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULT_DATABASE = "default"
+PIN_KEY = "replica:pinned:{}"
+
+# alias of the replica chosen for reads of the current request, None reads from primary database
+replica_reads = contextvars.ContextVar("replica_reads", default=None)
+
+
+def get_replicas():
+    """
+    Returns aliases of configured read replicas
+    """
+    return settings.DATABASE_REPLICAS
+
+
+def choose_replica():
+    """
+    Returns alias of a random replica, or None without replicas
+    """
+    replicas = get_replicas()
+    return random.choice(replicas) if replicas else None
+
+
+def pin_user(user):
+    """
+    Sends reads of the user to primary database for REPLICA_PIN_SECONDS,
+    so the user reads own writes while replicas catch up
+    """
+    if get_replicas() and user is not None and user.is_authenticated:
+        cache.set(PIN_KEY.format(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    """
+    Checks whether reads of the user have to go to primary database
+    """
+    return user is not None and user.is_authenticated and bool(cache.get(PIN_KEY.format(user.pk)))
+
+
+class ReplicaRouter:
+    """
+    Routes reads to the replica chosen for the current request, so all its queries see the same replica,
+    all other reads and all writes go to primary database
+    """
+
+    def db_for_read(self, model, **hints):  # pylint: disable=unused-argument
+        """
+        Returns replica alias for reads of views allowing them
+        """
+        return replica_reads.get() or DEFAULT_DATABASE
+
+    def db_for_write(self, model, **hints):  # pylint: disable=unused-argument
+        """
+        Returns primary database, also for objects read from replicas
+        """
+        return DEFAULT_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):  # pylint: disable=unused-argument
+        """
+        Allows relations between objects of primary and replicas, they hold the same data
+        """
+        return True
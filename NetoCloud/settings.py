@@ -9,10 +9,13 @@ https://docs.djangoproject.com/en/4.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
+
 import datetime
+import importlib.util
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -30,13 +33,18 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv("DEBUG")
 
-ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS").split(",")
+ALLOWED_HOSTS = [host for host in os.getenv("ALLOWED_HOSTS", "").split(",") if host]
 
 
 # Application definition
 
+# admin app is always installed for its models (e.g. LogEntry referencing users), but admin site
+# is served at admin/ only with ADMIN_ENABLED=1 and its modules are discovered when URL configuration
+# is loaded instead of during worker startup
+ADMIN_ENABLED = os.getenv("ADMIN_ENABLED", "0") == "1"
+
 INSTALLED_APPS = [
-    "django.contrib.admin",
+    "django.contrib.admin.apps.SimpleAdminConfig",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
@@ -54,6 +62,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.MetricsMiddleware",
+    "api.middleware.RequestLogMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -62,11 +72,13 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.middleware.ProfilingMiddleware",
+    "api.middleware.ReplicaPinMiddleware",
 ]
 
 ROOT_URLCONF = "NetoCloud.urls"
 CORS_URLS_REGEX = r"^/api/.*"
-CORS_ALLOWED_ORIGINS = os.getenv("ALLOWED_CORS_ORIGINS").split(",")
+CORS_ALLOWED_ORIGINS = [origin for origin in os.getenv("ALLOWED_CORS_ORIGINS", "").split(",") if origin]
 
 TEMPLATES = [
     {
@@ -98,9 +110,43 @@ DATABASES = {
         "PORT": os.getenv("DB_PORT"),
         "USER": os.getenv("DB_USER"),
         "PASSWORD": os.getenv("DB_PASSWORD"),
+        # connections are kept open between requests for DB_CONN_MAX_AGE seconds, 0 closes them after every request
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "1") == "1",
     }
 }
 
+# DB_POOL: "psycopg" keeps a connection pool in every worker (PostgreSQL with psycopg 3 only),
+# "pgbouncer" for PgBouncer in transaction pooling mode, which does not support server-side cursors
+DB_POOL = os.getenv("DB_POOL", "")
+if DB_POOL == "psycopg":
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            "timeout": int(os.getenv("DB_POOL_TIMEOUT", "10")),
+        }
+    }
+elif DB_POOL == "pgbouncer":
+    DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = True
+
+# DB_REPLICAS: comma separated replica hosts (host or host:port), database file names for SQLite.
+# Replicas share credentials of the primary database and mirror it in tests.
+DATABASE_REPLICAS = []
+for replica in filter(None, os.getenv("DB_REPLICAS", "").split(",")):
+    alias = f"replica_{len(DATABASE_REPLICAS) + 1}"
+    DATABASES[alias] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+    if "sqlite3" in (DATABASES["default"]["ENGINE"] or ""):
+        DATABASES[alias]["NAME"] = replica
+    else:
+        DATABASES[alias]["HOST"], _, port = replica.partition(":")
+        DATABASES[alias]["PORT"] = port or DATABASES["default"]["PORT"]
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ["NetoCloud.routers.ReplicaRouter"]
+# reads of a user go to primary database for this long after the user's writes, longer than replication lag
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "5"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -116,13 +162,44 @@ AUTH_PASSWORD_VALIDATORS = [
         },
     },
     {
-        "NAME": "django.contrib.auth.password_validation.CommonPasswordValidator",
+        "NAME": "user.validators.CommonPasswordValidator",
     },
     {
         "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
     },
 ]
 
+# PASSWORD_HASHER: hasher of new passwords, "pbkdf2", "scrypt" or "argon2" (requires `pip install argon2-cffi`,
+# scrypt is used without it). Hashes of other hashers are still accepted and rehashed on login.
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "pbkdf2")
+if PASSWORD_HASHER == "argon2" and importlib.util.find_spec("argon2") is None:
+    PASSWORD_HASHER = "scrypt"
+PASSWORD_HASHER_CLASSES = {
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "scrypt": "user.hashers.ScryptPasswordHasher",
+    "argon2": "user.hashers.Argon2PasswordHasher",
+}
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_CLASSES[PASSWORD_HASHER],
+    *(hasher for name, hasher in PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER),
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+# OWASP minimums: argon2id with 19 MiB memory, 2 iterations and 1 lane, scrypt with N=2^14, r=8, p=5
+ARGON2_TIME_COST = 2
+ARGON2_MEMORY_COST = 19 * 1024  # KiB
+ARGON2_PARALLELISM = 1
+SCRYPT_WORK_FACTOR = 2**14
+SCRYPT_BLOCK_SIZE = 8
+SCRYPT_PARALLELISM = 5
+# hashes computed at once and waiting per worker process, registrations over the limit get 503.
+# Limits are shared by GUNICORN_THREADS request threads of gthread workers (gunicorn.conf.py), they must
+# leave at least one request thread to reject with 503, keep workers * PASSWORD_HASHING_THREADS below the number of cores.
+GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", "4"))
+PASSWORD_HASHING_THREADS = int(os.getenv("PASSWORD_HASHING_THREADS", str(min(GUNICORN_THREADS - 1, 2))))
+PASSWORD_HASHING_QUEUE = int(os.getenv("PASSWORD_HASHING_QUEUE", str(max(GUNICORN_THREADS - PASSWORD_HASHING_THREADS - 1, 0))))
+if PASSWORD_HASHING_THREADS < 1 or PASSWORD_HASHING_QUEUE < 0 or PASSWORD_HASHING_THREADS + PASSWORD_HASHING_QUEUE >= GUNICORN_THREADS:
+    raise ImproperlyConfigured("PASSWORD_HASHING_THREADS must be positive, PASSWORD_HASHING_THREADS + PASSWORD_HASHING_QUEUE below GUNICORN_THREADS")
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
@@ -156,6 +233,7 @@ REST_FRAMEWORK = {
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticatedOrReadOnly"],
+    "DEFAULT_THROTTLE_CLASSES": ["files.throttling.RequestRateThrottle"],
 }
 
 SIMPLE_JWT = {
@@ -165,11 +243,93 @@ SIMPLE_JWT = {
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
 }
 
+# default quota of storages without own limit or plan, plans are cached in every process for QUOTA_CACHE_TTL seconds
 STORAGE_MAX_SIZE = 2000000000
+QUOTA_CACHE_TTL = 60
+
+# content type of uploaded file is detected from its data, files of denied types are skipped
+# before they are stored, if allowed types are set only they are accepted.
+# Comma separated types, types ending with "/" match the whole group, e.g. "image/,application/pdf"
+UPLOAD_ALLOWED_CONTENT_TYPES = [value for value in os.getenv("UPLOAD_ALLOWED_CONTENT_TYPES", "").split(",") if value]
+UPLOAD_DENIED_CONTENT_TYPES = [value for value in os.getenv("UPLOAD_DENIED_CONTENT_TYPES", "").split(",") if value]
+FILE_UPLOAD_HANDLERS = [
+    "files.uploadhandlers.SniffingMemoryFileUploadHandler",
+    "files.uploadhandlers.SniffingTemporaryFileUploadHandler",
+]
+
+# token bucket limits per user (per client address for anonymous requests), 0 disables a limit.
+# "local" buckets are kept by every worker process, "cache" buckets are shared through CACHES.
+THROTTLE_BACKEND = os.getenv("THROTTLE_BACKEND", "local")
+USER_REQUEST_RATE = float(os.getenv("USER_REQUEST_RATE", "0"))  # requests per second
+USER_REQUEST_BURST = int(os.getenv("USER_REQUEST_BURST", "50"))
+USER_DOWNLOAD_RATE = int(os.getenv("USER_DOWNLOAD_RATE", "0"))  # bytes per second
+USER_UPLOAD_RATE = int(os.getenv("USER_UPLOAD_RATE", "0"))  # bytes per second
+# total bandwidth of one file link shared by all clients
+LINK_DOWNLOAD_RATE = int(os.getenv("LINK_DOWNLOAD_RATE", "0"))  # bytes per second
+BANDWIDTH_BURST = 4 * 1024 * 1024
+
+# files of deleted users are purged by "purge_users" command after retention period
+USER_PURGE_RETENTION_DAYS = 30
+
+FILE_CHUNK_SIZE = 64 * 1024
+
+# "gzip" or "zstd" (requires zstandard package) to compress text-like uploads on disk
+FILE_COMPRESSION = os.getenv("FILE_COMPRESSION", "")
+
+# max width and height of image previews served by "?size=" parameter
+THUMBNAIL_SIZES = {"small": 256, "medium": 1024}
+THUMBNAIL_CACHE_ROOT = "cache/thumbnails/"
+THUMBNAIL_CACHE_MAX_SIZE = 500000000
+
+# cache shared by all workers (e.g. django.core.cache.backends.redis.RedisCache) for throttling,
+# share link revocation and replica pinning
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+# share link revocations and replica pins are published through the cache, a per-process cache
+# would not show them to other workers, so it is only allowed with DEBUG
+if not DEBUG and CACHES["default"]["BACKEND"].rsplit(".", 1)[-1] in ("LocMemCache", "DummyCache"):
+    raise ImproperlyConfigured("CACHE_BACKEND shared by all workers is required, e.g. django.core.cache.backends.redis.RedisCache")
+# share links are signed with SECRET_KEY, revoked link versions are kept in the shared cache
+SHARE_LINK_DEFAULT_TTL = 7 * 24 * 3600
+SHARE_LINK_MAX_TTL = 30 * 24 * 3600
+# max age of shared file responses in edge and browser caches, limits how long revoked link stays cached
+SHARE_LINK_CACHE_MAX_AGE = 3600
+
+# served files are buffered in memory and rolled up into daily tables with last download times by a background thread,
+# records that could not be written are kept for the next flush up to ACCESS_LOG_MAX_RECORDS
+ACCESS_LOG_BUFFER_SIZE = 1000
+ACCESS_LOG_FLUSH_INTERVAL = 60
+ACCESS_LOG_MAX_RECORDS = 100000
+
+# bearer token required by /metrics/ endpoint, endpoint is closed if empty
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# share of requests to profile and token that staff users send in X-Profile-Token header to profile a request
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILING_BUFFER_SIZE = 50
+PROFILING_STATS_LIMIT = 40
+
+DATA_UPLOAD_MAX_NUMBER_FILES = 1000
+
+# "watched" reopens files rotated by external logrotate, "size" rotation is only safe with a single worker process
+LOG_ROTATION = os.getenv("LOG_ROTATION", "watched")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 1000000)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_QUEUE_SIZE = 10000
 
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
+    "filters": {
+        "request_context": {
+            "()": "NetoCloud.log.RequestContextFilter",
+        },
+    },
     "formatters": {
         "django": {
             "format": "[{asctime}] {levelname} {message}",
@@ -178,7 +338,10 @@ LOGGING = {
         "gunicorn": {
             "format": "{levelname} {message}",
             "style": "{",
-        }
+        },
+        "json": {
+            "()": "NetoCloud.log.JsonFormatter",
+        },
     },
     "handlers": {
         "console": {
@@ -192,20 +355,33 @@ LOGGING = {
         },
         "django_log": {
             "level": "INFO",
-            "class": "logging.FileHandler",
+            "class": "NetoCloud.log.QueueFileHandler",
             "filename": "django.log",
-            "formatter": "django",
+            "rotation": LOG_ROTATION,
+            "max_bytes": LOG_MAX_BYTES,
+            "backup_count": LOG_BACKUP_COUNT,
+            "queue_size": LOG_QUEUE_SIZE,
+            "formatter": "json",
+            "filters": ["request_context"],
         },
         "gunicorn_access_log": {
             "level": "INFO",
-            "class": "logging.FileHandler",
+            "class": "NetoCloud.log.QueueFileHandler",
             "filename": "gunicorn_access.log",
+            "rotation": LOG_ROTATION,
+            "max_bytes": LOG_MAX_BYTES,
+            "backup_count": LOG_BACKUP_COUNT,
+            "queue_size": LOG_QUEUE_SIZE,
             "formatter": "gunicorn",
         },
         "gunicorn_error_log": {
             "level": "INFO",
-            "class": "logging.FileHandler",
+            "class": "NetoCloud.log.QueueFileHandler",
             "filename": "gunicorn_error.log",
+            "rotation": LOG_ROTATION,
+            "max_bytes": LOG_MAX_BYTES,
+            "backup_count": LOG_BACKUP_COUNT,
+            "queue_size": LOG_QUEUE_SIZE,
             "formatter": "gunicorn",
         },
     },
@@ -219,6 +395,11 @@ LOGGING = {
             "level": "INFO",
             "propagate": False,
         },
+        "netocloud.request": {
+            "handlers": ["django_log"],
+            "level": "INFO",
+            "propagate": False,
+        },
         "gunicorn.error": {
             "handlers": ["console", "gunicorn_error_log"],
             "level": "INFO",
@@ -1,12 +1,21 @@
+from django.conf import settings
 from django.urls import include, path
 
-from files.views import FileDownloadView
+from NetoCloud.lazy import lazy_view
 
 urlpatterns = [
-    path("<str:url>/", FileDownloadView.as_view()),
-    path("download/<str:url>/", FileDownloadView.as_view()),
+    path("metrics/", lazy_view("api.views.metrics_view")),
+    path("s/<str:token>/", lazy_view("files.views.FileShareDownloadView")),
+    path("<str:url>/", lazy_view("files.views.FileDownloadView")),
+    path("download/<str:url>/", lazy_view("files.views.FileDownloadView")),
     path("api/v1/", include("api.urls")),
     path("api/v1/", include("user.urls")),
     path("api/v1/", include("storage.urls")),
     path("api/v1/", include("files.urls")),
 ]
+
+if settings.ADMIN_ENABLED:
+    from django.contrib import admin  # pylint: disable=ungrouped-imports,wrong-import-position
+
+    admin.autodiscover()
+    urlpatterns.insert(0, path("admin/", admin.site.urls))
@@ -0,0 +1,54 @@
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.password_validation import get_default_password_validators
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+from django.utils import translation
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+
+def iter_url_patterns(patterns):
+    """
+    Yields URL patterns of all included URL configurations, compiling their regular expressions
+    """
+    for pattern in patterns:
+        pattern.pattern.regex  # pylint: disable=pointless-statement
+        if isinstance(pattern, URLResolver):
+            yield from iter_url_patterns(pattern.url_patterns)
+        else:
+            yield pattern
+
+
+def warm_up():
+    """
+    Builds structures Django and DRF otherwise build lazily on the first requests of every worker:
+    URL resolver with all views and serializers, model metadata, translations, REST framework
+    classes and password validators with the common passwords list.
+    Called in gunicorn master process, so preforked workers share them and start warm.
+    """
+    resolver = get_resolver()
+    for pattern in iter_url_patterns(resolver.url_patterns):
+        view_class = getattr(pattern.callback, "view_class", None)
+        serializer_class = getattr(view_class, "serializer_class", None)
+        if serializer_class is not None:
+            serializer_class().fields  # pylint: disable=expression-not-assigned
+    resolver.reverse_dict  # pylint: disable=pointless-statement
+
+    for model in apps.get_models():
+        model._meta.get_fields()  # pylint: disable=protected-access
+
+    for name in api_settings.import_strings:
+        getattr(api_settings, name)
+    for name in jwt_settings.import_strings:
+        getattr(jwt_settings, name)
+
+    if settings.USE_I18N:
+        # activation loads message catalogs of all installed apps
+        translation.activate(settings.LANGUAGE_CODE)
+        translation.deactivate()
+
+    get_default_password_validators()
+
+    # connections must not be inherited by forked workers
+    connections.close_all()
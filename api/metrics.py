@@ -0,0 +1,50 @@
+from prometheus_client import Counter, Histogram
+
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+QUERIES_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+REQUEST_LATENCY = Histogram(
+    "netocloud_request_duration_seconds",
+    "Request latency by view",
+    ["view", "method"],
+)
+REQUESTS = Counter(
+    "netocloud_requests_total",
+    "Requests by view and response status",
+    ["view", "method", "status"],
+)
+REQUEST_BODY_BYTES = Histogram(
+    "netocloud_request_body_bytes",
+    "Uploaded request body size by view",
+    ["view"],
+    buckets=BYTES_BUCKETS,
+)
+RESPONSE_BODY_BYTES = Histogram(
+    "netocloud_response_body_bytes",
+    "Downloaded response body size by view",
+    ["view"],
+    buckets=BYTES_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "netocloud_db_queries_per_request",
+    "Database queries executed per request",
+    ["view"],
+    buckets=QUERIES_BUCKETS,
+)
+DB_QUERY_DURATION = Histogram(
+    "netocloud_db_query_duration_seconds_per_request",
+    "Total database query time per request",
+    ["view"],
+)
+DISK_READ_BYTES = Counter(
+    "netocloud_disk_read_bytes_total",
+    "Bytes of stored files read from disk",
+)
+DISK_WRITE_BYTES = Counter(
+    "netocloud_disk_write_bytes_total",
+    "Bytes of uploaded files written to disk",
+)
+QUOTA_REJECTIONS = Counter(
+    "netocloud_quota_rejections_total",
+    "Uploads rejected because storage max size was exceeded",
+)
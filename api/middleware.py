@@ -0,0 +1,171 @@
+import logging
+import random
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+from NetoCloud.log import request_context
+from NetoCloud.routers import pin_user
+
+from .metrics import DB_QUERIES, DB_QUERY_DURATION, REQUEST_BODY_BYTES, REQUEST_LATENCY, REQUESTS, RESPONSE_BODY_BYTES
+from .profiling import is_profiling_requested, profile_buffer, profile_request
+
+logger = logging.getLogger("netocloud.request")
+
+
+class QueryStats:
+    """
+    Database execute wrapper counting queries and their total time
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+def get_view_name(request):
+    """
+    Returns name of the view that handled the request
+    """
+    resolver_match = getattr(request, "resolver_match", None)
+    if resolver_match is None:
+        return "unresolved"
+    view = getattr(resolver_match.func, "view_class", resolver_match.func)
+    return view.__name__
+
+
+def count_streamed_bytes(streaming_content, view):
+    """
+    Observes size of streamed response body once it is fully sent
+    """
+    size = 0
+    for chunk in streaming_content:
+        size += len(chunk)
+        yield chunk
+    RESPONSE_BODY_BYTES.labels(view).observe(size)
+
+
+class MetricsMiddleware:
+    """
+    Collects request latency, body sizes and database usage per view
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        view = get_view_name(request)
+        REQUEST_LATENCY.labels(view, request.method).observe(duration)
+        REQUESTS.labels(view, request.method, response.status_code).inc()
+        DB_QUERIES.labels(view).observe(queries.count)
+        DB_QUERY_DURATION.labels(view).observe(queries.duration)
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        if content_length:
+            REQUEST_BODY_BYTES.labels(view).observe(content_length)
+        if response.has_header("Content-Length"):
+            RESPONSE_BODY_BYTES.labels(view).observe(int(response["Content-Length"]))
+        elif response.streaming:
+            response.streaming_content = count_streamed_bytes(response.streaming_content, view)
+        else:
+            RESPONSE_BODY_BYTES.labels(view).observe(len(response.content))
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profiles sampled requests and requests of staff users carrying profiling token.
+    Other requests are passed through untouched.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        requested = is_profiling_requested(request)
+        sampled = settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE
+        if not requested and not sampled:
+            return self.get_response(request)
+        response, profile = profile_request(self.get_response, request)
+        if sampled or request.user.is_staff:
+            profile_buffer.add(profile)
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Pins reads of the user to primary database after successful writes
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_user(getattr(request, "user", None))
+        return response
+
+
+class RequestLogMiddleware:
+    """
+    Sets request context for log records and writes one structured record per request
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        context = {"request_id": request.headers.get("X-Request-ID") or uuid.uuid4().hex}
+        token = request_context.set(context)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            user = getattr(request, "user", None)
+            context["user_id"] = user.pk if user is not None else None
+            context["view"] = get_view_name(request)
+            logger.info(
+                "%s %s %s",
+                request.method,
+                request.path,
+                response.status_code,
+                extra={
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "duration": round(time.perf_counter() - start, 6),
+                    "bytes_in": int(request.META.get("CONTENT_LENGTH") or 0),
+                    "bytes_out": int(response["Content-Length"]) if response.has_header("Content-Length") else None,
+                },
+            )
+            response["X-Request-ID"] = context["request_id"]
+            return response
+        finally:
+            request_context.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """
+        Adds view name to request context for records logged by the view
+        """
+        context = request_context.get()
+        if context is not None:
+            context["view"] = getattr(view_func, "view_class", view_func).__name__
@@ -0,0 +1,41 @@
+from django.http import Http404
+from rest_framework.permissions import SAFE_METHODS
+
+from NetoCloud.routers import choose_replica, is_pinned, replica_reads
+
+
+class ReplicaReadMixin:
+    """
+    Reads safe requests from database replicas unless the user wrote recently.
+    Has to be placed before generic view classes.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Starts every request with reads from primary database
+        """
+        token = replica_reads.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            replica_reads.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        """
+        Chooses one replica for all reads of the request once the user is authenticated and permitted
+        """
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not is_pinned(request.user):
+            replica_reads.set(choose_replica())
+
+    def get_object(self):
+        """
+        Looks up object on primary database if it is not found on a lagging replica
+        """
+        try:
+            return super().get_object()
+        except Http404:
+            if replica_reads.get() is None:
+                raise
+            replica_reads.set(None)
+            return super().get_object()
@@ -0,0 +1,111 @@
+import cProfile
+import io
+import itertools
+import pstats
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper recording executed queries with their timings
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({"sql": sql, "duration": time.perf_counter() - start})
+
+
+class ProfileBuffer:
+    """
+    Bounded ring buffer of the latest request profiles of this worker process
+    """
+
+    def __init__(self, size):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._profiles = deque(maxlen=size)
+
+    def add(self, profile):
+        """
+        Adds profile to the buffer, dropping the oldest one if it is full
+        """
+        with self._lock:
+            profile["id"] = next(self._ids)
+            self._profiles.append(profile)
+
+    def list(self):
+        """
+        Returns profiles, newest first
+        """
+        with self._lock:
+            return list(reversed(self._profiles))
+
+    def get(self, profile_id):
+        """
+        Returns profile by id, None if it was dropped
+        """
+        for profile in self.list():
+            if profile["id"] == profile_id:
+                return profile
+        return None
+
+
+def is_profiling_requested(request):
+    """
+    Checks whether request carries profiling header token
+    """
+    token = request.headers.get("X-Profile-Token")
+    return bool(settings.PROFILING_TOKEN and token and secrets.compare_digest(token, settings.PROFILING_TOKEN))
+
+
+def profile_request(get_response, request):
+    """
+    Handles request under cProfile, recording executed queries.
+    Returns response and collected profile.
+    """
+    recorder = QueryRecorder()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+    duration = time.perf_counter() - start
+
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(settings.PROFILING_STATS_LIMIT)
+    user = getattr(request, "user", None)
+    profile = {
+        "created_at": timezone.now(),
+        "method": request.method,
+        "path": request.get_full_path(),
+        "status": response.status_code,
+        "user": user.username if user is not None and user.is_authenticated else None,
+        "duration": duration,
+        "queries_count": len(recorder.queries),
+        "queries_duration": sum(query["duration"] for query in recorder.queries),
+        "queries": recorder.queries,
+        "profile": stream.getvalue(),
+    }
+    return response, profile
+
+
+profile_buffer = ProfileBuffer(settings.PROFILING_BUFFER_SIZE)
@@ -1,8 +1,11 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
+
+from NetoCloud.lazy import lazy_view
 
 urlpatterns = [
-    path("token/", TokenObtainPairView.as_view()),
-    path("token/refresh/", TokenRefreshView.as_view()),
-    path("token/verify/", TokenVerifyView.as_view()),
+    path("token/", lazy_view("rest_framework_simplejwt.views.TokenObtainPairView")),
+    path("token/refresh/", lazy_view("rest_framework_simplejwt.views.TokenRefreshView")),
+    path("token/verify/", lazy_view("rest_framework_simplejwt.views.TokenVerifyView")),
+    path("profiles/", lazy_view("api.views.ProfileListView")),
+    path("profiles/<int:pk>/", lazy_view("api.views.ProfileDetailView")),
 ]
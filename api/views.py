@@ -0,0 +1,55 @@
+import hmac
+import os
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from user.permissions import isStaffEditorPermission
+
+from .profiling import profile_buffer
+
+
+def metrics_view(request):
+    """
+    Returns metrics in Prometheus text exposition format, aggregated over all workers in multiprocess mode,
+    access is denied unless METRICS_TOKEN is configured and sent as bearer token
+    """
+    authorization = request.headers.get("Authorization", "")
+    if not settings.METRICS_TOKEN or not hmac.compare_digest(authorization.encode(), f"Bearer {settings.METRICS_TOKEN}".encode()):
+        return HttpResponseForbidden()
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+class ProfileListView(APIView):
+    permission_classes = [isStaffEditorPermission]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Returns summaries of buffered request profiles, newest first
+        """
+        summaries = [
+            {key: value for key, value in profile.items() if key not in ("queries", "profile")} for profile in profile_buffer.list()
+        ]
+        return Response(summaries)
+
+
+class ProfileDetailView(APIView):
+    permission_classes = [isStaffEditorPermission]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Returns buffered request profile with executed queries and call profile
+        """
+        profile = profile_buffer.get(kwargs.get("pk"))
+        if profile is None:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(profile)
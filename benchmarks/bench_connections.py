@@ -0,0 +1,36 @@
+import pytest
+from django.conf import settings
+from django.db import connections
+
+from .utils import measure
+
+
+@pytest.mark.django_db
+def test_bench_user_detail_connections(dataset, rounds, client_factory):
+    """
+    Retrieve user with a new database connection for every request (CONN_MAX_AGE=0)
+    and with a persistent connection. The test connection cannot be closed inside
+    the test transaction, so the view runs on a dedicated copy of the connection which
+    is opened by the request and closed after it. The dataset is committed, so it is visible
+    to the copy. With DB_POOL=psycopg connection is taken from the pool.
+    """
+    client = client_factory(dataset.user)
+    url = f"/api/v1/users/{dataset.user.pk}/"
+    pool = bool(settings.DATABASES["default"].get("OPTIONS", {}).get("pool"))
+
+    def get_user(_):
+        response = client.get(url)
+        assert response.status_code == 200
+
+    def get_user_new_connection(i):
+        test_connection = connections["default"]
+        new_connection = test_connection.copy()
+        connections["default"] = new_connection
+        try:
+            get_user(i)
+        finally:
+            new_connection.close()
+            connections["default"] = test_connection
+
+    measure("UserDetailedView.new_connection", get_user_new_connection, rounds, pool=pool)
+    measure("UserDetailedView.persistent_connection", get_user, rounds, pool=pool)
@@ -0,0 +1,69 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from .utils import measure
+
+UPLOAD_SIZE = 100000
+
+
+@pytest.mark.django_db
+def test_bench_file_create(dataset, rounds, client_factory):
+    """
+    Upload one small file per request
+    """
+    client = client_factory(dataset.user)
+    content = b"x" * UPLOAD_SIZE
+
+    def upload(i):
+        file = SimpleUploadedFile(f"upload{i}.txt", content, content_type="text/plain")
+        response = client.post("/api/v1/files/", data={"file_data": file, "name": f"upload{i}.txt", "path": "bench/"})
+        assert response.status_code == 201
+
+    measure("FileCreateView", upload, rounds, bytes=UPLOAD_SIZE)
+
+
+@pytest.mark.django_db
+def test_bench_file_download(dataset, rounds, client_factory):
+    """
+    Download file by its url without token
+    """
+    client = client_factory()
+    url = f"/download{dataset.download_file.url_path}"
+
+    def download(_):
+        response = client.get(url)
+        assert response.status_code == 200
+        for _ in response.streaming_content:
+            pass
+
+    measure("FileDownloadView", download, rounds, bytes=dataset.download_file.size)
+
+
+@pytest.mark.django_db
+def test_bench_storage_retrieve(dataset, rounds, client_factory):
+    """
+    Get storage with all its files
+    """
+    client = client_factory(dataset.user)
+    url = f"/api/v1/storages/{dataset.user.storage.pk}/"
+
+    def retrieve(_):
+        response = client.get(url)
+        assert response.status_code == 200
+
+    measure("StorageRetrieveView", retrieve, rounds, files=dataset.user.storage.files.count())
+
+
+@pytest.mark.django_db
+def test_bench_storage_folder(dataset, rounds, client_factory):
+    """
+    Open folder of storage: its subfolders with files count and size and the first page of its files
+    """
+    client = client_factory(dataset.user)
+    url = f"/api/v1/storages/{dataset.user.storage.pk}/folders/?path=home/"
+
+    def list_folder(_):
+        response = client.get(url)
+        assert response.status_code == 200
+
+    measure("StorageFolderView", list_folder, rounds, files=dataset.user.storage.files.count())
@@ -0,0 +1,99 @@
+import re
+import statistics
+import subprocess
+import sys
+
+import pytest
+
+from .utils import measure, record
+
+STARTUP_ROUNDS = 10
+IMPORT_TIME_PATTERN = re.compile(r"^import time:\s+(\d+) \|", re.MULTILINE)
+
+# worker cold start: Django setup, URL configuration and modules of the view serving the first request
+BOOT_SCRIPT = """
+from NetoCloud.wsgi import application
+from django.urls import resolve
+
+resolve("/download/00000000-0000-0000-0000-000000000000/").func.view_class
+"""
+
+# preloading master process forks a worker which serves its first request, as gunicorn with preload_app does.
+# Unauthenticated request goes through middleware, authentication, permissions, renderers and translations
+# without database queries. Prints latency of the request and memory the worker does not share with master.
+FORK_SCRIPT = """
+import gc
+import os
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+warm = sys.argv[1] == "warm"
+if warm:
+    gc.disable()
+from django.conf import settings
+
+from NetoCloud.wsgi import application
+
+if warm:
+    from NetoCloud.warmup import warm_up
+
+    warm_up()
+    gc.freeze()
+    gc.enable()
+read_fd, write_fd = os.pipe()
+pid = os.fork()
+if pid == 0:
+    environ = {"PATH_INFO": "/api/v1/files/search/", "QUERY_STRING": "q=report", "HTTP_HOST": (settings.ALLOWED_HOSTS or ["localhost"])[0]}
+    setup_testing_defaults(environ)
+    start = time.perf_counter()
+    b"".join(application(environ, lambda status, headers: None))
+    latency = time.perf_counter() - start
+    with open("/proc/self/smaps_rollup", encoding="utf-8") as fh:
+        private = sum(int(line.split()[1]) * 1024 for line in fh if line.startswith("Private_"))
+    os.write(write_fd, f"{latency} {private}".encode())
+    os._exit(0)
+os.waitpid(pid, 0)
+print(os.read(read_fd, 100).decode())
+"""
+
+
+def boot_worker(importtime=False):
+    """
+    Boots application in a new interpreter and returns its stderr
+    """
+    args = [sys.executable, *(["-X", "importtime"] if importtime else []), "-c", BOOT_SCRIPT]
+    return subprocess.run(args, capture_output=True, text=True, check=True).stderr
+
+
+@pytest.mark.django_db
+def test_bench_startup(rounds):
+    """
+    Boot worker until it can serve file download, with total import time and number of imported modules
+    """
+    import_times = [int(value) for value in IMPORT_TIME_PATTERN.findall(boot_worker(importtime=True))]
+    measure(
+        "startup",
+        lambda _: boot_worker(),
+        min(rounds, STARTUP_ROUNDS),
+        warmup=1,
+        import_time=sum(import_times) / 1000000,
+        modules=len(import_times),
+    )
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="needs fork and /proc")
+def test_bench_first_request(rounds):
+    """
+    First request of a worker forked from cold and from warmed up master process,
+    with private (not shared with master) memory of the worker
+    """
+    for mode in ("cold", "warm"):
+        timings = []
+        private_memory = []
+        for _ in range(min(rounds, STARTUP_ROUNDS)):
+            output = subprocess.run([sys.executable, "-c", FORK_SCRIPT, mode], capture_output=True, text=True, check=True).stdout
+            latency, private = output.split()
+            timings.append(float(latency))
+            private_memory.append(int(private))
+        record(f"first_request.{mode}", timings, private_memory=statistics.median(private_memory))
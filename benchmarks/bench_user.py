@@ -0,0 +1,90 @@
+import importlib.util
+import os
+
+import pytest
+from django.conf import settings
+from django.test import override_settings
+
+from .datasets import PASSWORD
+from .utils import measure
+
+
+@pytest.mark.django_db
+def test_bench_user_list(dataset, rounds, client_factory):
+    """
+    List all active users with admin token
+    """
+    client = client_factory(dataset.admin)
+
+    def list_users(_):
+        response = client.get("/api/v1/users/")
+        assert response.status_code == 200
+
+    measure("UserListCreateView.list", list_users, rounds, users=dataset.users_count)
+
+
+@pytest.mark.django_db
+def test_bench_user_create(dataset, rounds, client_factory):
+    """
+    Register new user
+    """
+    client = client_factory()
+
+    def create_user(i):
+        data = {
+            "username": f"new{i + 10}",
+            "password": PASSWORD,
+            "repeat_password": PASSWORD,
+            "email": f"new{i + 10}@bench.test",
+            "full_name": "New User",
+        }
+        response = client.post("/api/v1/users/", data=data, format="json")
+        assert response.status_code == 201
+
+    measure("UserListCreateView.create", create_user, rounds)
+
+
+@pytest.mark.django_db
+def test_bench_token_obtain(dataset, rounds, client_factory):
+    """
+    Issue access and refresh tokens by username and password
+    """
+    client = client_factory()
+    data = {"username": dataset.user.username, "password": PASSWORD}
+
+    def obtain_token(_):
+        response = client.post("/api/v1/token/", data=data, format="json")
+        assert response.status_code == 200
+
+    measure("TokenObtainPairView", obtain_token, rounds)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "hasher",
+    [
+        "pbkdf2",
+        "scrypt",
+        pytest.param("argon2", marks=pytest.mark.skipif(importlib.util.find_spec("argon2") is None, reason="needs argon2-cffi")),
+    ],
+)
+def test_bench_user_create_hasher(dataset, rounds, client_factory, hasher):
+    """
+    Register new user with passwords hashed by each hasher, throughput is per core of the server
+    """
+    client = client_factory()
+    hashers = [settings.PASSWORD_HASHER_CLASSES[hasher], *settings.PASSWORD_HASHERS]
+
+    def create_user(i):
+        data = {
+            "username": f"{hasher}{i + 10}",
+            "password": PASSWORD,
+            "repeat_password": PASSWORD,
+            "email": f"{hasher}{i + 10}@bench.test",
+            "full_name": "New User",
+        }
+        response = client.post("/api/v1/users/", data=data, format="json")
+        assert response.status_code == 201
+
+    with override_settings(PASSWORD_HASHERS=hashers):
+        measure(f"UserListCreateView.create.{hasher}", create_user, rounds, cores=os.cpu_count())
@@ -0,0 +1,52 @@
+"""
+Compares two benchmark result files.
+
+Usage: python -m benchmarks.compare base.json new.json [--threshold 0.1]
+"""
+
+import argparse
+import json
+import sys
+
+
+def load(path):
+    """
+    Returns benchmark results by name
+    """
+    with open(path, encoding="utf-8") as fh:
+        return {result["name"]: result for result in json.load(fh)["results"]}
+
+
+def main():
+    """
+    Prints comparison table and exits with 1 if new results regressed
+    """
+    parser = argparse.ArgumentParser(description="Compare benchmark results of two commits")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed relative p50/p99 slowdown")
+    args = parser.parse_args()
+
+    base = load(args.base)
+    new = load(args.new)
+    regressions = []
+    print(f"{'benchmark':30} {'p50 base':>10} {'p50 new':>10} {'p99 base':>10} {'p99 new':>10} {'queries':>9}")
+    for name in sorted(base.keys() & new.keys()):
+        old_result, new_result = base[name], new[name]
+        print(
+            f"{name:30} {old_result['p50'] * 1000:9.2f}ms {new_result['p50'] * 1000:9.2f}ms "
+            f"{old_result['p99'] * 1000:9.2f}ms {new_result['p99'] * 1000:9.2f}ms "
+            f"{old_result['queries']:>4}->{new_result['queries']:<4}"
+        )
+        for metric in ("p50", "p99"):
+            if new_result[metric] > old_result[metric] * (1 + args.threshold):
+                regressions.append(f"{name} {metric}")
+        if new_result["queries"] > old_result["queries"]:
+            regressions.append(f"{name} queries")
+    if regressions:
+        print("Regressions: " + ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import datetime
+import json
+import os
+import platform
+import subprocess
+
+import django
+import pytest
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .datasets import seed_dataset
+from .utils import results
+
+BENCH_USERS = int(os.getenv("BENCH_USERS", "1000"))
+BENCH_FILES = int(os.getenv("BENCH_FILES", "10000"))
+BENCH_ROUNDS = int(os.getenv("BENCH_ROUNDS", "50"))
+BENCH_DOWNLOAD_SIZE = int(os.getenv("BENCH_DOWNLOAD_SIZE", str(10 * 1000000)))
+BENCH_OUTPUT = os.getenv("BENCH_OUTPUT", "bench_results.json")
+
+
+@pytest.fixture(scope="session")
+def bench_media_root(tmp_path_factory):
+    """
+    Temporary MEDIA_ROOT for files written by benchmarks
+    """
+    media_root = tmp_path_factory.mktemp("media")
+    with override_settings(MEDIA_ROOT=str(media_root)):
+        yield media_root
+
+
+@pytest.fixture(scope="session")
+def dataset(request, django_db_setup, django_db_blocker):
+    """
+    Seeds benchmark dataset once per session
+    """
+    request.getfixturevalue("bench_media_root")
+    with django_db_blocker.unblock():
+        return seed_dataset(BENCH_USERS, BENCH_FILES, BENCH_DOWNLOAD_SIZE)
+
+
+@pytest.fixture
+def rounds():
+    """
+    Number of measured rounds of every benchmark
+    """
+    return BENCH_ROUNDS
+
+
+@pytest.fixture
+def client_factory():
+    """
+    Returns api client authenticated with JWT of the given user
+    """
+
+    def factory(user=None):
+        client = APIClient()
+        if user is not None:
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        return client
+
+    return factory
+
+
+def get_commit():
+    """
+    Returns current git commit
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """
+    Writes collected benchmark results for comparison between commits
+    """
+    if not results:
+        return
+    report = {
+        "commit": get_commit(),
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "users": BENCH_USERS,
+        "files": BENCH_FILES,
+        "results": results,
+    }
+    with open(BENCH_OUTPUT, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
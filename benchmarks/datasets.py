@@ -0,0 +1,127 @@
+import os
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db.models import Count, Sum
+
+from files.folders import rebuild_folders
+from files.models import File
+from storage.models import Storage
+from user.models import User
+
+BATCH_SIZE = 5000
+FOLDERS = ("", "home/", "home/photos/", "home/documents/", "work/", "work/reports/2023/")
+CONTENT_TYPES = ("text/plain", "image/jpeg", "application/pdf", "video/mp4", "application/json")
+PASSWORD = "benchpassword!"
+
+
+@dataclass
+class Dataset:
+    users_count: int
+    files_count: int
+    admin: User
+    user: User
+    download_file: File
+
+
+def get_file_size(rnd):
+    """
+    Returns file size from mixed distribution: mostly small documents, some photos, few videos
+    """
+    kind = rnd.random()
+    if kind < 0.7:
+        return rnd.randint(100, 100000)
+    if kind < 0.95:
+        return rnd.randint(500000, 10000000)
+    return rnd.randint(10000000, 100000000)
+
+
+def seed_users(users_count):
+    """
+    Creates users with storages by bulk inserts, all users share one password hash
+    """
+    password = make_password(PASSWORD)
+    users = [
+        User(username=f"bench{i}", email=f"bench{i}@bench.test", full_name=f"Bench User {i}", password=password, is_staff=i == 0)
+        for i in range(users_count)
+    ]
+    users = User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+    Storage.objects.bulk_create([Storage(owner=user) for user in users], batch_size=BATCH_SIZE)
+    return users
+
+
+def seed_files(storages, files_count, rnd):
+    """
+    Creates file rows by bulk inserts, a tenth of files belongs to the first non-admin storage.
+    Every storage is filled up to half of STORAGE_MAX_SIZE at most, so uploads in benchmarks stay within quota
+    """
+    budget = settings.STORAGE_MAX_SIZE // 2
+    used = defaultdict(int)
+    for start in range(0, files_count, BATCH_SIZE):
+        files = []
+        for i in range(start, min(start + BATCH_SIZE, files_count)):
+            storage = storages[1] if i % 10 == 0 else rnd.choice(storages)
+            path = rnd.choice(FOLDERS)
+            size = get_file_size(rnd)
+            if used[storage.pk] + size > budget:
+                size = min(rnd.randint(100, 100000), budget - used[storage.pk])
+            used[storage.pk] += size
+            files.append(
+                File(
+                    file_data=f"{storage.owner.username}/{path}file{i}.bin",
+                    storage=storage,
+                    name=f"file{i}.bin",
+                    origin_name=f"file{i}.bin",
+                    content_type=rnd.choice(CONTENT_TYPES),
+                    size=size,
+                    path=path,
+                )
+            )
+        File.objects.bulk_create(files)
+    totals = File.objects.values("storage_id").annotate(count=Count("pk"), size=Sum("size"))
+    storages_by_pk = {storage.pk: storage for storage in storages}
+    for total in totals:
+        storages_by_pk[total["storage_id"]].files_count = total["count"]
+        storages_by_pk[total["storage_id"]].files_size = total["size"]
+    Storage.objects.bulk_update(storages, ["files_count", "files_size"], batch_size=BATCH_SIZE)
+    for start in range(0, len(storages), BATCH_SIZE):
+        rebuild_folders(storages[start : start + BATCH_SIZE])
+
+
+def seed_download_file(storage, size):
+    """
+    Creates file that exists on disk for download benchmarks
+    """
+    name = f"{storage.owner.username}/download.bin"
+    os.makedirs(os.path.dirname(File.file_data.field.storage.path(name)), exist_ok=True)
+    with open(File.file_data.field.storage.path(name), "wb") as fh:
+        fh.write(os.urandom(size))
+    return File.objects.create(
+        file_data=name,
+        storage=storage,
+        name="download.bin",
+        origin_name="download.bin",
+        content_type="application/octet-stream",
+        size=size,
+    )
+
+
+def seed_dataset(users_count, files_count, download_size, seed=0):
+    """
+    Seeds database with users, storages and files of realistic sizes
+    """
+    rnd = random.Random(seed)
+    users = seed_users(users_count)
+    storages = list(Storage.objects.select_related("owner").order_by("pk"))
+    seed_files(storages, files_count, rnd)
+    download_file = seed_download_file(storages[1], download_size)
+    return Dataset(
+        users_count=users_count,
+        files_count=files_count,
+        admin=users[0],
+        user=User.objects.get(pk=users[1].pk),
+        download_file=download_file,
+    )
@@ -0,0 +1,63 @@
+import statistics
+import time
+import tracemalloc
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+results = []
+
+
+def percentile(timings, value):
+    """
+    Returns percentile of sorted timings
+    """
+    index = min(len(timings) - 1, round(value / 100 * (len(timings) - 1)))
+    return timings[index]
+
+
+def measure(name, func, rounds, warmup=3, **extra):
+    """
+    Runs func rounds times and records latency percentiles, throughput, query count and peak memory.
+    func receives round number, so it can create unique data.
+    """
+    for i in range(warmup):
+        func(-i - 1)
+
+    timings = []
+    queries = []
+    for i in range(rounds):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            func(i)
+            timings.append(time.perf_counter() - start)
+        queries.append(len(context.captured_queries))
+
+    tracemalloc.start()
+    func(rounds)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return record(name, timings, queries=max(queries), peak_memory=peak_memory, **extra)
+
+
+def record(name, timings, queries=0, peak_memory=0, **extra):
+    """
+    Records latency percentiles and throughput of timings measured elsewhere, e.g. in a subprocess
+    """
+    timings = sorted(timings)
+    result = {
+        "name": name,
+        "rounds": len(timings),
+        "mean": statistics.mean(timings),
+        "p50": percentile(timings, 50),
+        "p99": percentile(timings, 99),
+        "min": timings[0],
+        "max": timings[-1],
+        "ops_per_second": len(timings) / sum(timings),
+        "queries": queries,
+        "peak_memory": peak_memory,
+        **extra,
+    }
+    results.append(result)
+    return result
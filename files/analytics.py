@@ -0,0 +1,134 @@
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from storage.models import Storage, StorageAccessDaily
+
+from .models import File, FileAccessDaily
+
+logger = logging.getLogger(__name__)
+
+
+def upsert_rollups(model, key_field, totals):
+    """
+    Adds access totals to daily rollup rows, creating missing rows first.
+    Rows are locked, so concurrent flushes from other workers are not lost.
+    """
+    if not totals:
+        return
+    keys = {key for key, _ in totals}
+    dates = {date for _, date in totals}
+    with transaction.atomic():
+        model.objects.bulk_create(
+            [model(**{key_field: key, "date": date}) for key, date in totals],
+            ignore_conflicts=True,
+        )
+        rows = list(model.objects.select_for_update().filter(**{f"{key_field}__in": keys, "date__in": dates}))
+        for row in rows:
+            downloads, bytes_served = totals.get((getattr(row, key_field), row.date), (0, 0))
+            row.downloads += downloads
+            row.bytes_served += bytes_served
+        model.objects.bulk_update(rows, ["downloads", "bytes_served"])
+
+
+class AccessLog:
+    """
+    Append-only in-memory log of served files, periodically rolled up into daily tables
+    and last download times of files by a background thread
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = []
+        self._last_flush = time.monotonic()
+        self._flushing = False
+
+    def record(self, file_obj, bytes_served, downloaded=False):
+        """
+        Appends served file to the log and starts background flush when buffer is full or flush interval has passed
+        """
+        now = timezone.now()
+        with self._lock:
+            self._records.append((file_obj.pk, file_obj.storage_id, now.date(), bytes_served, now if downloaded else None))
+            flush = not self._flushing and (
+                len(self._records) >= settings.ACCESS_LOG_BUFFER_SIZE
+                or time.monotonic() - self._last_flush >= settings.ACCESS_LOG_FLUSH_INTERVAL
+            )
+            if flush:
+                self._flushing = True
+        if flush:
+            threading.Thread(target=self.flush_in_background, name="access-log-flush", daemon=True).start()
+
+    def flush_in_background(self):
+        """
+        Flushes the log outside of request threads, failed records are kept for the next flush
+        """
+        try:
+            self.flush()
+        except DatabaseError:
+            logger.exception("Access log flush failed")
+        finally:
+            with self._lock:
+                self._flushing = False
+            connection.close()
+
+    def flush(self):
+        """
+        Rolls buffered records up into daily file and storage totals and saves last download times.
+        If database is not available, records are put back into the buffer up to ACCESS_LOG_MAX_RECORDS.
+        """
+        with self._lock:
+            records, self._records = self._records, []
+            self._last_flush = time.monotonic()
+        if not records:
+            return
+        try:
+            self.save(records)
+        except DatabaseError:
+            with self._lock:
+                self._records[:0] = records
+                del self._records[: max(len(self._records) - settings.ACCESS_LOG_MAX_RECORDS, 0)]
+            raise
+
+    def save(self, records):
+        """
+        Writes rollups and last download times of the records
+        """
+        file_totals = defaultdict(lambda: [0, 0])
+        storage_totals = defaultdict(lambda: [0, 0])
+        last_downloads = {}
+        for file_id, storage_id, date, bytes_served, downloaded_at in records:
+            for totals, key in ((file_totals, file_id), (storage_totals, storage_id)):
+                totals[key, date][0] += 1
+                totals[key, date][1] += bytes_served
+            if downloaded_at is not None:
+                last_downloads[file_id] = max(downloaded_at, last_downloads.get(file_id, downloaded_at))
+        file_ids = set(File.objects.filter(pk__in={key for key, _ in file_totals}).values_list("pk", flat=True))
+        storage_ids = set(Storage.objects.filter(pk__in={key for key, _ in storage_totals}).values_list("pk", flat=True))
+        with transaction.atomic():
+            upsert_rollups(FileAccessDaily, "file_id", {key: value for key, value in file_totals.items() if key[0] in file_ids})
+            upsert_rollups(StorageAccessDaily, "storage_id", {key: value for key, value in storage_totals.items() if key[0] in storage_ids})
+            File.objects.bulk_update(
+                [File(pk=file_id, last_download=downloaded_at) for file_id, downloaded_at in last_downloads.items() if file_id in file_ids],
+                ["last_download"],
+            )
+
+
+def flush_on_exit():
+    """
+    Flushes records left in the buffer when worker exits
+    """
+    try:
+        access_log.flush()
+    except DatabaseError:
+        logger.exception("Access log records were lost on exit")
+
+
+access_log = AccessLog()
+atexit.register(flush_on_exit)
@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+from .search import setup_search_index
+
+
+def create_search_index(sender, using, **kwargs):  # pylint: disable=unused-argument
+    """
+    Creates full-text search indexes after migrations
+    """
+    setup_search_index(using)
 
 
 class FilesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "files"
+
+    def ready(self):
+        post_migrate.connect(create_search_index, sender=self)
@@ -0,0 +1,90 @@
+import os
+import zipfile
+
+from .compression import iter_file_chunks
+
+COMPRESSED_CONTENT_TYPES = {
+    "application/gzip",
+    "application/pdf",
+    "application/vnd.rar",
+    "application/x-7z-compressed",
+    "application/x-bzip2",
+    "application/x-gzip",
+    "application/x-rar-compressed",
+    "application/x-xz",
+    "application/zip",
+    "application/zstd",
+    "image/gif",
+    "image/jpeg",
+    "image/png",
+    "image/webp",
+}
+COMPRESSED_CONTENT_TYPE_PREFIXES = ("audio/", "video/")
+
+
+class ZipStreamBuffer:
+    """
+    Write-only buffer that collects zip output until it is drained by the generator.
+    It has no tell()/seek(), so zipfile writes entries with data descriptors.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        """
+        Collects written data
+        """
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        """
+        Nothing to flush, data is drained by the generator
+        """
+
+    def drain(self):
+        """
+        Returns buffered data and empties the buffer
+        """
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def is_compressed_content_type(content_type):
+    """
+    Checks whether content of the given type is already compressed
+    """
+    return content_type in COMPRESSED_CONTENT_TYPES or content_type.startswith(COMPRESSED_CONTENT_TYPE_PREFIXES)
+
+
+def stream_zip(files, prefix=""):
+    """
+    Yields ZIP64 archive of the given files by chunks without building it in memory or on disk.
+    Archive entries are named relative to the prefix.
+    """
+    buffer = ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w", allowZip64=True) as archive:
+        for file_obj in files:
+            if not os.path.exists(file_obj.file_data.path):
+                continue
+            zip_info = zipfile.ZipInfo(
+                filename=f"{file_obj.path[len(prefix):]}{file_obj.name}",
+                date_time=file_obj.created_at.timetuple()[:6],
+            )
+            zip_info.external_attr = 0o644 << 16
+            if is_compressed_content_type(file_obj.content_type):
+                zip_info.compress_type = zipfile.ZIP_STORED
+            else:
+                zip_info.compress_type = zipfile.ZIP_DEFLATED
+            with archive.open(zip_info, mode="w", force_zip64=True) as entry:
+                for chunk in iter_file_chunks(file_obj):
+                    entry.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            data = buffer.drain()
+            if data:
+                yield data
+    yield buffer.drain()
@@ -0,0 +1,87 @@
+import os
+import shutil
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FICLONE = 0x40049409
+
+
+def iter_blobs(path=""):
+    """
+    Yields names relative to MEDIA_ROOT and DirEntry objects of all files stored under the path
+    """
+    root = os.path.join(settings.MEDIA_ROOT, *path.split("/"))
+    if not os.path.isdir(root):
+        return
+    stack = [(root, f"{path.strip('/')}/" if path.strip("/") else "")]
+    while stack:
+        directory, prefix = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, f"{prefix}{entry.name}/"))
+                elif entry.is_file(follow_symlinks=False):
+                    yield f"{prefix}{entry.name}", entry
+
+
+def copy_range(source, target):
+    """
+    Copies file content inside the kernel without passing it through user space
+    """
+    size = os.fstat(source.fileno()).st_size
+    copied = 0
+    while copied < size:
+        if hasattr(os, "copy_file_range"):
+            count = os.copy_file_range(source.fileno(), target.fileno(), size - copied)
+        else:
+            count = os.sendfile(target.fileno(), source.fileno(), copied, size - copied)
+        if not count:
+            break
+        copied += count
+
+
+def clone_blob(source_path, target_path):
+    """
+    Creates file with content of the source sharing stored bytes where the filesystem allows:
+    hardlink (stored files are never modified in place, so links are safe to share), reflink,
+    then in-kernel copy. Returns used method: "link", "reflink" or "copy".
+
+    Modification time of the target is set to now, hardlinks and reflinks keep the time of the source,
+    so collect_orphans would treat a copy made during its sweep as an old orphan.
+    """
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    method = copy_blob(source_path, target_path)
+    os.utime(target_path)
+    return method
+
+
+def copy_blob(source_path, target_path):
+    """
+    Shares or copies content of the source into the new target file, returns used method
+    """
+    try:
+        os.link(source_path, target_path)
+        return "link"
+    except OSError as err:
+        if isinstance(err, FileExistsError):
+            raise
+    with open(source_path, "rb") as source, open(target_path, "xb") as target:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+                return "reflink"
+            except OSError:
+                pass
+        try:
+            copy_range(source, target)
+        except OSError:
+            source.seek(0)
+            target.seek(0)
+            target.truncate()
+            shutil.copyfileobj(source, target, settings.FILE_CHUNK_SIZE)
+    return "copy"
@@ -0,0 +1,123 @@
+import tempfile
+import zlib
+
+from django.conf import settings
+from django.core.files import File as DjangoFile
+
+from api.metrics import DISK_READ_BYTES
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_CONTENT_TYPES = {
+    "application/csv",
+    "application/javascript",
+    "application/json",
+    "application/sql",
+    "application/x-ndjson",
+    "application/x-yaml",
+    "application/xml",
+    "application/yaml",
+    "image/svg+xml",
+}
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def get_compression():
+    """
+    Returns encoding used for new uploads, empty string if compression is disabled
+    """
+    encoding = settings.FILE_COMPRESSION
+    if encoding == "zstd" and zstandard is None:
+        return "gzip"
+    return encoding
+
+
+def is_compressible(content_type):
+    """
+    Checks whether content of the given type is worth compressing
+    """
+    return content_type.startswith("text/") or content_type in COMPRESSIBLE_CONTENT_TYPES
+
+
+def get_compressor(encoding):
+    """
+    Returns streaming compressor for the encoding
+    """
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor().compressobj()
+    return zlib.compressobj(wbits=GZIP_WBITS)
+
+
+def get_decompressor(encoding):
+    """
+    Returns streaming decompressor for the encoding
+    """
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj()
+    return zlib.decompressobj(wbits=GZIP_WBITS)
+
+
+def compress_upload(upload, content_type):
+    """
+    Compresses uploaded file by chunks if its content type is compressible.
+    Returns file to store and its encoding, the upload itself is returned
+    if compression is disabled or does not reduce the size.
+    """
+    encoding = get_compression()
+    if not encoding or not is_compressible(content_type):
+        return upload, ""
+    compressor = get_compressor(encoding)
+    compressed = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)  # pylint: disable=consider-using-with
+    for chunk in upload.chunks(settings.FILE_CHUNK_SIZE):
+        compressed.write(compressor.compress(chunk))
+    compressed.write(compressor.flush())
+    if compressed.tell() >= upload.size:
+        compressed.close()
+        return upload, ""
+    compressed.seek(0)
+    return DjangoFile(compressed, name=upload.name), encoding
+
+
+def iter_decompressed(chunks, encoding):
+    """
+    Decompresses chunks on the fly
+    """
+    decompressor = get_decompressor(encoding)
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+def iter_file_chunks(file_obj, decompress=True, chunk_size=None):
+    """
+    Yields file content from disk by chunks, decompressing it if it is stored compressed
+    """
+    chunk_size = chunk_size or settings.FILE_CHUNK_SIZE
+
+    def read_chunks():
+        with open(file_obj.file_data.path, "rb") as fh:
+            while chunk := fh.read(chunk_size):
+                DISK_READ_BYTES.inc(len(chunk))
+                yield chunk
+
+    if decompress and file_obj.encoding:
+        return iter_decompressed(read_chunks(), file_obj.encoding)
+    return read_chunks()
+
+
+def accepts_encoding(request, encoding):
+    """
+    Checks whether client accepts content in the given encoding
+    """
+    for value in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        coding, _, params = value.strip().partition(";")
+        if coding.strip() in (encoding, "*") and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            return True
+    return False
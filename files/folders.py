@@ -0,0 +1,67 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from storage.models import Storage
+
+from .models import File, Folder, get_folder_paths, get_parent_path
+
+
+def rebuild_folders(storages):
+    """
+    Recomputes folders of the storages from their files with one grouped query,
+    used after files were written without signals, e.g. by bulk inserts.
+    Storage rows are locked before files are read, so uploads to the storages wait for the new folders.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    with transaction.atomic():
+        list(Storage.objects.select_for_update().filter(pk__in=[storage.pk for storage in storages]).values_list("pk", flat=True))
+        rows = (
+            File.objects.filter(storage__in=storages).order_by().values("storage_id", "path").annotate(count=Count("pk"), size=Sum("size"))
+        )
+        for row in rows:
+            for path in get_folder_paths(row["path"]):
+                totals[(row["storage_id"], path)][0] += row["count"]
+                totals[(row["storage_id"], path)][1] += row["size"]
+        Folder.objects.filter(storage__in=storages).delete()
+        Folder.objects.bulk_create(
+            Folder(storage_id=storage_id, path=path, parent=get_parent_path(path), files_count=files_count, files_size=files_size)
+            for (storage_id, path), (files_count, files_size) in totals.items()
+        )
+
+
+class FolderListing:
+    """
+    Sliceable listing of a folder for paginator: subfolders ordered by path followed by files ordered by name.
+    A page reads only the rows it shows, subfolders by (storage, parent, path) index of folders
+    and files by (storage, path, name) index of files.
+    """
+
+    def __init__(self, storage, path):
+        self.folders = Folder.objects.filter(storage=storage, parent=path).order_by("path")
+        self.files = storage.files.filter(path=path).order_by("name", "pk")
+        self._folders_count = None
+
+    def get_folders_count(self):
+        """
+        Returns number of subfolders, counted once
+        """
+        if self._folders_count is None:
+            self._folders_count = self.folders.count()
+        return self._folders_count
+
+    def count(self):
+        """
+        Returns number of subfolders and files of the folder
+        """
+        return self.get_folders_count() + self.files.count()
+
+    def __getitem__(self, page):
+        """
+        Returns subfolders and files of the page as (folders, files) pair
+        """
+        folders_count = self.get_folders_count()
+        folders = list(self.folders[page.start : min(page.stop, folders_count)]) if page.start < folders_count else []
+        files = list(self.files[max(page.start - folders_count, 0) : page.stop - folders_count]) if page.stop > folders_count else []
+        return folders, files
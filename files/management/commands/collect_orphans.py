@@ -0,0 +1,90 @@
+import hashlib
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from files.blobs import iter_blobs
+from files.models import File, clear_empty_folders
+
+
+def get_name_hash(name):
+    """
+    Returns 64-bit hash of stored file name, sets of hashes take a fraction of memory of sets of names
+    """
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "little")
+
+
+class RateLimiter:
+    """
+    Sleeps to keep operations under the given rate per second, no limit if rate is 0
+    """
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_time = time.monotonic()
+
+    def wait(self):
+        """
+        Waits until next operation is allowed
+        """
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_time > now:
+            time.sleep(self.next_time - now)
+        self.next_time = max(now, self.next_time) + self.interval
+
+
+class Command(BaseCommand):
+    help = "Deletes files in MEDIA_ROOT that are not referenced by any File (mark and sweep)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="only report orphaned files")
+        parser.add_argument("--grace-period", type=int, default=3600, help="seconds files are kept after last modification")
+        parser.add_argument("--batch-size", type=int, default=10000, help="File rows fetched per query during mark")
+        parser.add_argument("--scan-rate", type=float, default=0, help="max files scanned per second, 0 for no limit")
+        parser.add_argument("--delete-rate", type=float, default=0, help="max files deleted per second, 0 for no limit")
+
+    def handle(self, *args, **options):
+        marked = self.mark(options["batch_size"])
+        scanned, orphaned, orphaned_size = self.sweep(marked, options)
+        action = "found" if options["dry_run"] else "deleted"
+        self.stdout.write(f"Scanned {scanned} files: {orphaned} orphaned files of {orphaned_size} bytes {action}")
+
+    def mark(self, batch_size):
+        """
+        Returns hashes of all stored file names, streamed from database by batches
+        """
+        return {get_name_hash(name) for name in File.objects.values_list("file_data", flat=True).iterator(chunk_size=batch_size)}
+
+    def sweep(self, marked, options):
+        """
+        Walks MEDIA_ROOT and deletes unmarked files older than grace period
+        """
+        scan_limiter = RateLimiter(options["scan_rate"])
+        delete_limiter = RateLimiter(options["delete_rate"])
+        deadline = time.time() - options["grace_period"]
+        scanned = orphaned = orphaned_size = 0
+        for name, entry in iter_blobs():
+            scan_limiter.wait()
+            scanned += 1
+            if get_name_hash(name) in marked:
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime > deadline:
+                continue
+            orphaned += 1
+            orphaned_size += stat.st_size
+            if options["dry_run"]:
+                self.stdout.write(f"Orphaned file: {name}")
+                continue
+            delete_limiter.wait()
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            clear_empty_folders(os.path.dirname(entry.path))
+            if options["verbosity"] >= 2:
+                self.stdout.write(f"Deleted file: {name}")
+        return scanned, orphaned, orphaned_size
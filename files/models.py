@@ -1,12 +1,22 @@
+import logging
 import os
 import uuid
+from collections import defaultdict
 
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.query import QuerySet
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from storage.models import Storage
 
+from .sharing import forget_share_links
+from .thumbnails import delete_thumbnails
+
+logger = logging.getLogger(__name__)
+
 
 def get_upload_path(instance, filename):
     """
@@ -19,11 +29,13 @@ def clear_empty_folders(path):
     """
     Clears empty folders
     """
-    if path.endswith("media"):
+    if os.path.abspath(path) == os.path.abspath(settings.MEDIA_ROOT):
         return
-    if not os.listdir(path):
+    try:
         os.rmdir(path)
-        clear_empty_folders(os.path.dirname(path))
+    except OSError:
+        return
+    clear_empty_folders(os.path.dirname(path))
 
 
 class File(models.Model):
@@ -33,14 +45,18 @@ class File(models.Model):
     origin_name = models.CharField(max_length=100)
     url = models.UUIDField(default=uuid.uuid4, editable=False)
     content_type = models.CharField(max_length=100)
-    size = models.PositiveIntegerField()
+    size = models.PositiveBigIntegerField()
+    stored_size = models.PositiveBigIntegerField(blank=True, null=True)
+    encoding = models.CharField(max_length=10, blank=True, default="")
     path = models.CharField(max_length=300, default="")
     note = models.CharField(max_length=1000, blank=True, default="")
     last_download = models.DateTimeField(blank=True, null=True)
+    share_version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ("pk",)
+        indexes = [models.Index(fields=["storage", "path", "name"], name="files_file_storage_path_idx")]
 
     @property
     def url_path(self):
@@ -56,30 +72,181 @@ class File(models.Model):
         return f"{self.name} {self.created_at}"
 
 
+class FileAccessDaily(models.Model):
+    file = models.ForeignKey(File, on_delete=models.CASCADE, related_name="access_rollups")
+    date = models.DateField()
+    downloads = models.PositiveIntegerField(default=0)
+    bytes_served = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        ordering = ("-date", "file")
+        constraints = [models.UniqueConstraint(fields=["file", "date"], name="unique_file_access_date")]
+
+    def __str__(self) -> str:
+        """
+        File access rollup text representation
+        """
+        return f"{self.file_id} {self.date}"
+
+
+class FileChange(models.Model):
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    ACTIONS = [(CREATED, "Created"), (UPDATED, "Updated"), (DELETED, "Deleted")]
+
+    storage = models.ForeignKey(Storage, on_delete=models.CASCADE, related_name="changes")
+    seq = models.PositiveBigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    file_id = models.BigIntegerField()
+    name = models.CharField(max_length=100)
+    path = models.CharField(max_length=300, default="")
+    size = models.PositiveBigIntegerField(default=0)
+    url = models.UUIDField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ("storage", "seq")
+        constraints = [models.UniqueConstraint(fields=["storage", "seq"], name="unique_storage_change_seq")]
+
+    @property
+    def url_path(self):
+        """
+        Returns url_path for file download, None for deleted file
+        """
+        return None if self.action == self.DELETED else f"/{self.url}/"
+
+    def __str__(self) -> str:
+        """
+        File change text representation
+        """
+        return f"{self.storage_id} {self.seq} {self.action}"
+
+
+class Folder(models.Model):
+    storage = models.ForeignKey(Storage, on_delete=models.CASCADE, related_name="folders")
+    path = models.CharField(max_length=300)
+    parent = models.CharField(max_length=300, default="")
+    files_count = models.PositiveIntegerField(default=0)
+    files_size = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        ordering = ("storage", "path")
+        constraints = [models.UniqueConstraint(fields=["storage", "path"], name="unique_storage_folder_path")]
+        indexes = [models.Index(fields=["storage", "parent", "path"], name="files_folder_parent_idx")]
+
+    @property
+    def name(self):
+        """
+        Returns last part of the folder path
+        """
+        return self.path.rstrip("/").rsplit("/", 1)[-1]
+
+    def __str__(self) -> str:
+        """
+        Folder text representation
+        """
+        return f"{self.storage_id} {self.path}"
+
+
+def get_folder_paths(path):
+    """
+    Returns paths of the folder and all its parent folders, e.g. "home/" and "home/docs/" for "home/docs/"
+    """
+    parts = path.split("/")[:-1]
+    return ["".join(f"{part}/" for part in parts[: i + 1]) for i in range(len(parts))]
+
+
+def get_parent_path(path):
+    """
+    Returns path of the parent folder, "" for folders in the root
+    """
+    return path[: path.rstrip("/").rfind("/") + 1]
+
+
+def update_folders(storage_id, files, sign=1):
+    """
+    Adds (sign=1) or subtracts (sign=-1) files to totals of their folder and all parent folders.
+    Folders are created with their first file and deleted with their last one. Rows are locked,
+    so concurrent updates from other workers are not lost.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for file_obj in files:
+        for path in get_folder_paths(file_obj.path):
+            totals[path][0] += 1
+            totals[path][1] += file_obj.size
+    if not totals:
+        return
+    with transaction.atomic():
+        if sign > 0:
+            Folder.objects.bulk_create(
+                [Folder(storage_id=storage_id, path=path, parent=get_parent_path(path)) for path in totals],
+                ignore_conflicts=True,
+            )
+        rows = list(Folder.objects.select_for_update().filter(storage_id=storage_id, path__in=totals))
+        for row in rows:
+            files_count, files_size = totals[row.path]
+            row.files_count = max(row.files_count + sign * files_count, 0)
+            row.files_size = max(row.files_size + sign * files_size, 0)
+        Folder.objects.bulk_update(rows, ["files_count", "files_size"])
+        if sign < 0:
+            Folder.objects.filter(storage_id=storage_id, path__in=totals, files_count=0).delete()
+
+
+def record_changes(storage_id, action, files):
+    """
+    Appends changes of the files to the storage change journal. Sequence numbers are allocated
+    under the storage row lock held until commit, so changes become visible in sequence order.
+    """
+    if not files:
+        return
+    with transaction.atomic():
+        Storage.objects.filter(pk=storage_id).update(change_seq=F("change_seq") + len(files))
+        last_seq = Storage.objects.filter(pk=storage_id).values_list("change_seq", flat=True).get()
+        FileChange.objects.bulk_create(
+            FileChange(
+                storage_id=storage_id,
+                seq=last_seq - len(files) + number,
+                action=action,
+                file_id=file_obj.pk,
+                name=file_obj.name,
+                path=file_obj.path,
+                size=file_obj.size,
+                url=file_obj.url,
+            )
+            for number, file_obj in enumerate(files, 1)
+        )
+
+
 @receiver(post_save, sender=File)
 def file_create(sender, instance, using, **kwargs):
     """
-    Increments storage file_count and file_size after File was uploaded
+    Increments storage and folder file_count and file_size after File was uploaded and records the change
     """
     if kwargs.get("created"):
-        storage = instance.storage
-        storage.files_count += 1
-        storage.files_size += instance.size
-        storage.save()
+        Storage.objects.filter(pk=instance.storage_id).update(files_count=F("files_count") + 1, files_size=F("files_size") + instance.size)
+        update_folders(instance.storage_id, [instance])
+        record_changes(instance.storage_id, FileChange.CREATED, [instance])
+    elif kwargs.get("update_fields") != {"last_download"}:
+        record_changes(instance.storage_id, FileChange.UPDATED, [instance])
 
 
 @receiver(post_delete, sender=File)
 def file_delete(sender, instance, using, **kwargs):
     """
-    Decrements storage file_count and file_size after File was deleted
+    Decrements storage and folder file_count and file_size after File was deleted and records the change.
+    Files deleted together with their storage are not recorded, their folders are deleted with the storage.
     """
     try:
         if os.path.exists(instance.file_data.path):
             os.remove(instance.file_data.path)
             clear_empty_folders(os.path.dirname(instance.file_data.path))
     except ValueError as err:
-        print(err)
-    storage = instance.storage
-    storage.files_count -= 1
-    storage.files_size -= instance.size
-    storage.save()
+        logger.warning("File %s has no stored file: %s", instance.pk, err)
+    delete_thumbnails(instance)
+    forget_share_links([instance])
+    Storage.objects.filter(pk=instance.storage_id).update(files_count=F("files_count") - 1, files_size=F("files_size") - instance.size)
+    origin = kwargs.get("origin")
+    if isinstance(origin, File) or isinstance(origin, QuerySet) and origin.model is File:
+        update_folders(instance.storage_id, [instance], sign=-1)
+        record_changes(instance.storage_id, FileChange.DELETED, [instance])
@@ -0,0 +1,167 @@
+import logging
+import re
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELDS = ("name", "origin_name", "note", "path", "content_type")
+MAX_SEARCH_TERMS = 10
+TERM_PATTERN = re.compile(r"\w+")
+
+FTS_TABLE = "files_file_fts"
+FTS_COLUMNS = ", ".join(SEARCH_FIELDS)
+FTS_NEW_VALUES = ", ".join(f"new.{field}" for field in SEARCH_FIELDS)
+FTS_OLD_VALUES = ", ".join(f"old.{field}" for field in SEARCH_FIELDS)
+SQLITE_SETUP_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({FTS_COLUMNS}, "
+    "content='files_file', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON files_file BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS}) VALUES (new.id, {FTS_NEW_VALUES}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON files_file BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {FTS_COLUMNS}) VALUES ('delete', old.id, {FTS_OLD_VALUES}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {FTS_COLUMNS} ON files_file BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {FTS_COLUMNS}) VALUES ('delete', old.id, {FTS_OLD_VALUES}); "
+    f"INSERT INTO {FTS_TABLE}(rowid, {FTS_COLUMNS}) VALUES (new.id, {FTS_NEW_VALUES}); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+# Slashes and dots are replaced, so paths, content types and file names are split into words
+# instead of being parsed by PostgreSQL as single file path or host tokens
+PG_SEARCH_VECTOR = (
+    "to_tsvector('simple'::regconfig, translate("
+    "files_file.name || ' ' || files_file.origin_name || ' ' || files_file.note || ' ' "
+    "|| files_file.path || ' ' || files_file.content_type, '/.', '  '))"
+)
+PG_SETUP_SQL = f"CREATE INDEX IF NOT EXISTS files_file_search_idx ON files_file USING gin (({PG_SEARCH_VECTOR}))"
+PG_TRGM_SETUP_SQL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS files_file_name_trgm_idx ON files_file USING gin (name gin_trgm_ops)",
+)
+
+_backends = {}
+
+
+def setup_search_index(using="default"):
+    """
+    Creates search indexes for the database: FTS5 table kept in sync by triggers on SQLite,
+    full-text and trigram indexes on PostgreSQL. Safe to run after every migration,
+    SQLite triggers are dropped whenever migrations rebuild the files table.
+    """
+    connection = connections[using]
+    _backends.pop(using, None)
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            try:
+                for sql in SQLITE_SETUP_SQL:
+                    cursor.execute(sql)
+            except DatabaseError as err:
+                logger.warning("Full-text search is disabled, SQLite has no FTS5 support: %s", err)
+        elif connection.vendor == "postgresql":
+            cursor.execute(PG_SETUP_SQL)
+            try:
+                with transaction.atomic(using=using):
+                    for sql in PG_TRGM_SETUP_SQL:
+                        cursor.execute(sql)
+            except DatabaseError as err:
+                logger.warning("Trigram search is disabled, pg_trgm extension is not available: %s", err)
+
+
+def get_search_backend(using="default"):
+    """
+    Returns search backend available in the database: "sqlite", "postgresql", "postgresql_trgm"
+    or empty string if only substring search is possible
+    """
+    if using not in _backends:
+        connection = connections[using]
+        backend = ""
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                if FTS_TABLE in connection.introspection.table_names(cursor):
+                    backend = "sqlite"
+        elif connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                backend = "postgresql_trgm" if cursor.fetchone() else "postgresql"
+        _backends[using] = backend
+    return _backends[using]
+
+
+def get_search_terms(query):
+    """
+    Splits search query into lowercase words
+    """
+    return TERM_PATTERN.findall(query.lower())[:MAX_SEARCH_TERMS]
+
+
+def search_sqlite(queryset, terms):
+    """
+    Matches all terms as prefixes in FTS5 index, ranked by bm25
+    """
+    match = " ".join(f'"{term}"*' for term in terms)
+    return queryset.filter(
+        RawSQL(f"files_file.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)", [match], output_field=BooleanField())
+    ).annotate(
+        rank=RawSQL(
+            f"(SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = files_file.id)",
+            [match],
+            output_field=FloatField(),
+        )
+    )
+
+
+def search_postgresql(queryset, terms, query, trigram):
+    """
+    Matches all terms as prefixes in full-text index, ranked by ts_rank.
+    With pg_trgm names similar to the query are matched too, so typos are tolerated.
+    """
+    tsquery = " & ".join(f"{term}:*" for term in terms)
+    if not trigram:
+        return queryset.filter(RawSQL(f"{PG_SEARCH_VECTOR} @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField())).annotate(
+            rank=RawSQL(f"ts_rank({PG_SEARCH_VECTOR}, to_tsquery('simple', %s))", [tsquery], output_field=FloatField())
+        )
+    return queryset.filter(
+        RawSQL(
+            f"({PG_SEARCH_VECTOR} @@ to_tsquery('simple', %s) OR files_file.name %% %s)",
+            [tsquery, query],
+            output_field=BooleanField(),
+        )
+    ).annotate(
+        rank=RawSQL(
+            f"ts_rank({PG_SEARCH_VECTOR}, to_tsquery('simple', %s)) + similarity(files_file.name, %s)",
+            [tsquery, query],
+            output_field=FloatField(),
+        )
+    )
+
+
+def search_fallback(queryset, terms):
+    """
+    Matches all terms as substrings of any searched field, without ranking
+    """
+    for term in terms:
+        condition = Q()
+        for field in SEARCH_FIELDS:
+            condition |= Q(**{f"{field}__icontains": term})
+        queryset = queryset.filter(condition)
+    return queryset.annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+def search_files(queryset, query):
+    """
+    Filters files matching every word of the query by prefix in name, origin name, note, path
+    or content type and orders them by relevance
+    """
+    terms = get_search_terms(query)
+    if not terms:
+        return queryset.none()
+    backend = get_search_backend(queryset.db)
+    if backend == "sqlite":
+        queryset = search_sqlite(queryset, terms)
+    elif backend.startswith("postgresql"):
+        queryset = search_postgresql(queryset, terms, query, backend == "postgresql_trgm")
+    else:
+        queryset = search_fallback(queryset, terms)
+    return queryset.order_by("-rank", "pk")
@@ -1,9 +1,55 @@
+import datetime
+import os
 import re
+import time
 
 from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
 from rest_framework import serializers
 
-from .models import File
+from api.metrics import DISK_WRITE_BYTES, QUOTA_REJECTIONS
+from storage.models import Storage
+from storage.quotas import get_max_size, get_quota_error
+
+from .blobs import clone_blob
+from .compression import compress_upload
+from .models import File, FileAccessDaily, FileChange, Folder, record_changes, update_folders
+from .sharing import SHARE_PERMISSIONS, make_share_token
+
+PATH_PATTERN = re.compile(r"(?:^[^\.\\]+/)+$")
+
+
+def validate_file_path(value):
+    """
+    Path validation
+    """
+    if not PATH_PATTERN.match(value) and value != "" or "//" in value:
+        raise serializers.ValidationError({"error": "Invalid path format. Forbidden symbols: '.', '\\'. Example: 'home/folder/path/'."})
+    return value
+
+
+def check_new_file(storage, path, name, size):
+    """
+    Checks that file with the name does not exist in the path and fits into the storage quota
+    """
+    if File.objects.filter(storage=storage, path=path, name=name).exists():
+        raise serializers.ValidationError({"error": f"File with path '{path}' and name '{name}' already exists."})
+    max_size = get_max_size(storage)
+    if storage.files_size + size > max_size:
+        QUOTA_REJECTIONS.inc()
+        raise serializers.ValidationError({"error": get_quota_error(max_size)})
+
+
+def get_rejection_results(request):
+    """
+    Returns upload results of files skipped because of their content type
+    """
+    return [
+        {"name": rejection["name"], "created": False, "error": rejection["error"]}
+        for rejection in getattr(request, "upload_rejections", [])
+    ]
 
 
 class FileSerializer(serializers.ModelSerializer):
@@ -32,28 +78,215 @@ class FileSerializer(serializers.ModelSerializer):
         """
         Path validation
         """
-        path_pattern = re.compile(r"(?:^[^\.\\]+/)+$")
-        if not path_pattern.match(attrs) and attrs != "" or "//" in attrs:
-            raise serializers.ValidationError({"error": "Invalid path format. Forbidden symbols: '.', '\\'. Example: 'home/folder/path/'."})
-        return attrs
+        return validate_file_path(attrs)
+
+    def to_internal_value(self, data):
+        rejections = getattr(self.context.get("request"), "upload_rejections", None)
+        if rejections:
+            raise serializers.ValidationError({"error": rejections[0]["error"]})
+        return super().to_internal_value(data)
 
     def create(self, validated_data):
+        """
+        File content is compressed and stored before the storage row is locked, the checks are repeated
+        under the lock, so concurrent uploads cannot exceed the quota. Stored content of rejected file is deleted.
+        """
         request = self.context.get("request")
-        obj = File.objects.filter(storage__owner=request.user, path=validated_data.get("path", ""), name=validated_data.get("name"))
-        if obj.exists():
-            raise serializers.ValidationError(
-                {"error": f"File with path '{validated_data.get('path', '')}' and name '{validated_data.get('name')}' already exists."}
-            )
-
+        storage = request.user.storage
         validated_data["origin_name"] = request.FILES.get("file_data").name
         validated_data["size"] = request.FILES.get("file_data").size
         validated_data["content_type"] = request.FILES.get("file_data").content_type
-        validated_data["storage"] = request.user.storage
-        if validated_data["storage"].files_size + validated_data["size"] > settings.STORAGE_MAX_SIZE:
-            raise serializers.ValidationError(
-                {"error": f"User's storage is limited with max files_size value of {settings.STORAGE_MAX_SIZE // 1000000000} GB"}
+        check_new_file(storage, validated_data.get("path", ""), validated_data.get("name"), validated_data["size"])
+        content, validated_data["encoding"] = compress_upload(validated_data["file_data"], validated_data["content_type"])
+        validated_data["file_data"] = content
+        validated_data["stored_size"] = content.size
+        file_obj = File(storage=storage, **validated_data)
+        file_obj.file_data.save(file_obj.file_data.name, content, save=False)
+        DISK_WRITE_BYTES.inc(content.size)
+        try:
+            with transaction.atomic():
+                file_obj.storage = Storage.objects.select_for_update().get(pk=storage.pk)
+                check_new_file(file_obj.storage, file_obj.path, file_obj.name, file_obj.size)
+                file_obj.save()
+        except Exception:
+            file_obj.file_data.delete(save=False)
+            raise
+        return file_obj
+
+
+class FileBulkSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    file_data = serializers.ListField(child=serializers.FileField(), allow_empty=False, write_only=True)
+    path = serializers.CharField(allow_blank=True, default="", max_length=300)
+    note = serializers.CharField(allow_blank=True, default="", max_length=1000)
+
+    def validate_path(self, attrs):
+        """
+        Path validation
+        """
+        return validate_file_path(attrs)
+
+    def build_file(self, upload, storage, path, note):
+        """
+        Stores uploaded file content and returns unsaved File
+        """
+        content, encoding = compress_upload(upload, upload.content_type)
+        file_obj = File(
+            storage=storage,
+            name=upload.name,
+            origin_name=upload.name,
+            size=upload.size,
+            stored_size=content.size,
+            encoding=encoding,
+            content_type=upload.content_type,
+            path=path,
+            note=note,
+        )
+        file_obj.file_data.save(upload.name, content, save=False)
+        DISK_WRITE_BYTES.inc(content.size)
+        return file_obj
+
+    def select_files(self, files, storage, path):
+        """
+        Returns (file, result) pairs of uploads or files that can be saved to the storage,
+        results of the others get the error
+        """
+        max_size = get_max_size(storage)
+        existing = set(
+            File.objects.filter(storage=storage, path=path, name__in=[obj.name for obj, _ in files]).values_list("name", flat=True)
+        )
+        selected = []
+        files_size = 0
+        for obj, result in files:
+            if len(obj.name) > File._meta.get_field("name").max_length:
+                result["error"] = "File name is too long."
+            elif obj.name in existing:
+                result["error"] = f"File with path '{path}' and name '{obj.name}' already exists."
+            elif storage.files_size + files_size + obj.size > max_size:
+                QUOTA_REJECTIONS.inc()
+                result["error"] = get_quota_error(max_size)
+            else:
+                existing.add(obj.name)
+                selected.append((obj, result))
+                files_size += obj.size
+        return selected
+
+    def create(self, validated_data):
+        """
+        Saves all valid files with one bulk insert and returns per-file results.
+        File contents are compressed and stored before the storage row is locked, the checks are repeated
+        under the lock, so concurrent uploads cannot exceed the quota. Stored contents of rejected files are deleted.
+        """
+        request = self.context.get("request")
+        storage = request.user.storage
+        path = validated_data.get("path", "")
+        results = get_rejection_results(request)
+        uploads = []
+        for upload in validated_data.get("file_data"):
+            results.append({"name": upload.name, "created": False})
+            uploads.append((upload, results[-1]))
+        files = [
+            (self.build_file(upload, storage, path, validated_data.get("note", "")), result)
+            for upload, result in self.select_files(uploads, storage, path)
+        ]
+        try:
+            with transaction.atomic():
+                storage = Storage.objects.select_for_update().get(pk=storage.pk)
+                selected = self.select_files(files, storage, path)
+                for file_obj, result in files:
+                    if "error" in result:
+                        file_obj.file_data.delete(save=False)
+                files = selected
+                File.objects.bulk_create([file_obj for file_obj, _ in files])
+                Storage.objects.filter(pk=storage.pk).update(
+                    files_count=F("files_count") + len(files), files_size=F("files_size") + sum(file_obj.size for file_obj, _ in files)
+                )
+                update_folders(storage.pk, [file_obj for file_obj, _ in files])
+                record_changes(storage.pk, FileChange.CREATED, [file_obj for file_obj, _ in files])
+        except Exception:
+            for file_obj, _ in files:
+                file_obj.file_data.delete(save=False)
+            raise
+        for file_obj, result in files:
+            result["created"] = True
+            result["file"] = FileSerializer(file_obj).data
+        return results
+
+    def to_representation(self, instance):
+        return instance
+
+
+class FileCopySerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    name = serializers.CharField(required=False, max_length=100)
+    path = serializers.CharField(required=False, allow_blank=True, max_length=300)
+
+    def validate_path(self, attrs):
+        """
+        Path validation
+        """
+        return validate_file_path(attrs)
+
+    def create(self, validated_data):
+        """
+        Creates copy of the source file in its storage sharing stored bytes where possible.
+        Storage row is locked until the copy is saved, so concurrent copies cannot exceed the quota.
+        """
+        source = self.context.get("source")
+        name = validated_data.get("name", source.name)
+        path = validated_data.get("path", source.path)
+        with transaction.atomic():
+            storage = Storage.objects.select_for_update().get(pk=source.storage_id)
+            if File.objects.filter(storage=storage, path=path, name=name).exists():
+                raise serializers.ValidationError({"error": f"File with path '{path}' and name '{name}' already exists."})
+            max_size = get_max_size(storage)
+            if storage.files_size + source.size > max_size:
+                QUOTA_REJECTIONS.inc()
+                raise serializers.ValidationError({"error": get_quota_error(max_size)})
+            file_obj = File(
+                storage=storage,
+                name=name,
+                origin_name=source.origin_name,
+                size=source.size,
+                stored_size=source.stored_size,
+                encoding=source.encoding,
+                content_type=source.content_type,
+                path=path,
+                note=source.note,
             )
-        return super().create(validated_data)
+            field = File._meta.get_field("file_data")
+            blob_name = default_storage.get_available_name(field.generate_filename(file_obj, name), max_length=field.max_length)
+            if clone_blob(source.file_data.path, default_storage.path(blob_name)) == "copy":
+                DISK_WRITE_BYTES.inc(os.path.getsize(default_storage.path(blob_name)))
+            file_obj.file_data.name = blob_name
+            try:
+                file_obj.save()
+            except Exception:
+                default_storage.delete(blob_name)
+                raise
+        return file_obj
+
+    def to_representation(self, instance):
+        return FileSerializer(instance).data
+
+
+class FileShareSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    expires_in = serializers.IntegerField(min_value=1, max_value=settings.SHARE_LINK_MAX_TTL, default=settings.SHARE_LINK_DEFAULT_TTL)
+    permission = serializers.ChoiceField(choices=SHARE_PERMISSIONS, default="download")
+
+    def create(self, validated_data):
+        """
+        Issues signed share link of the file
+        """
+        expires_at = int(time.time()) + validated_data.get("expires_in")
+        token = make_share_token(self.context.get("file"), expires_at, validated_data.get("permission"))
+        return {
+            "token": token,
+            "url_path": f"/s/{token}/",
+            "permission": validated_data.get("permission"),
+            "expires_at": datetime.datetime.fromtimestamp(expires_at, datetime.timezone.utc).isoformat(),
+        }
+
+    def to_representation(self, instance):
+        return instance
 
 
 class FileUpdateSerializer(serializers.ModelSerializer):
@@ -68,3 +301,26 @@ class FileUpdateSerializer(serializers.ModelSerializer):
             if obj.exists():
                 raise serializers.ValidationError({"error": f"File with path '{instance.path}' and name '{name}' already exists."})
         return super().update(instance, validated_data)
+
+
+class FileAccessDailySerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source="file.name", read_only=True)
+    path = serializers.CharField(source="file.path", read_only=True)
+
+    class Meta:
+        model = FileAccessDaily
+        fields = ["file", "name", "path", "date", "downloads", "bytes_served"]
+
+
+class FileChangeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FileChange
+        fields = ["seq", "action", "file_id", "name", "path", "size", "url_path", "created_at"]
+
+
+class FolderSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Folder
+        fields = ["name", "path", "files_count", "files_size"]
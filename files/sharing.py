@@ -0,0 +1,110 @@
+import functools
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+SHARE_TOKEN_SALT = "files.share"
+SHARE_PERMISSIONS = ("inline", "download")
+DELETED_VERSION = -1
+
+
+def get_version_cache_key(file_id, url):
+    """
+    Returns cache key of the file share version, file url is never reused by another file
+    """
+    return f"files:share_version:{file_id}:{url}"
+
+
+def make_share_token(file_obj, expires_at, permission):
+    """
+    Returns signed token carrying everything needed to serve the file without a database query
+    """
+    payload = {
+        "f": file_obj.pk,
+        "u": str(file_obj.url),
+        "s": file_obj.storage_id,
+        "b": file_obj.file_data.name,
+        "n": file_obj.name,
+        "t": file_obj.content_type,
+        "e": file_obj.encoding,
+        "z": file_obj.size,
+        "v": file_obj.share_version,
+        "x": int(expires_at),
+        "p": permission,
+    }
+    return signing.dumps(payload, salt=SHARE_TOKEN_SALT, compress=True)
+
+
+def load_share_token(token):
+    """
+    Returns payload of the token, raises signing.BadSignature if it is forged
+    """
+    return signing.loads(token, salt=SHARE_TOKEN_SALT)
+
+
+def get_share_version(file_id, url):
+    """
+    Returns current share version of the file from the cache shared by all workers,
+    reading it from database on cache miss. Deleted file has no valid version.
+    """
+    key = get_version_cache_key(file_id, url)
+    version = cache.get(key)
+    if version is None:
+        version = apps.get_model("files", "File").objects.filter(pk=file_id, url=url).values_list("share_version", flat=True).first()
+        version = DELETED_VERSION if version is None else version
+        # add does not overwrite a version published by revocation meanwhile
+        cache.add(key, version, settings.SHARE_LINK_MAX_TTL)
+    return version
+
+
+def set_share_versions(versions):
+    """
+    Publishes share versions of files by (file_id, url) to the cache
+    """
+    cache.set_many(
+        {get_version_cache_key(file_id, url): version for (file_id, url), version in versions.items()}, settings.SHARE_LINK_MAX_TTL
+    )
+
+
+def forget_share_links(files):
+    """
+    Invalidates links of deleted files once deletion is committed
+    """
+    versions = {(file_obj.pk, str(file_obj.url)): DELETED_VERSION for file_obj in files}
+    transaction.on_commit(functools.partial(set_share_versions, versions))
+
+
+def is_share_token_valid(payload):
+    """
+    Checks that token has not expired and file links were not revoked since it was issued
+    """
+    return payload["x"] > time.time() and payload["v"] == get_share_version(payload["f"], payload["u"])
+
+
+def revoke_share_links(file_obj):
+    """
+    Invalidates all issued links of the file by bumping its share version
+    """
+    type(file_obj).objects.filter(pk=file_obj.pk).update(share_version=F("share_version") + 1)
+    file_obj.refresh_from_db(fields=["share_version"])
+    transaction.on_commit(functools.partial(set_share_versions, {(file_obj.pk, str(file_obj.url)): file_obj.share_version}))
+
+
+def get_shared_file(payload):
+    """
+    Returns unsaved File built from token payload, usable to serve the file
+    """
+    return apps.get_model("files", "File")(
+        pk=payload["f"],
+        storage_id=payload["s"],
+        file_data=payload["b"],
+        name=payload["n"],
+        content_type=payload["t"],
+        encoding=payload["e"],
+        size=payload["z"],
+    )
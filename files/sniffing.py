@@ -0,0 +1,103 @@
+from django.conf import settings
+
+SNIFF_SIZE = 512
+
+# (offset, magic bytes, content type), longer and more specific signatures first
+SIGNATURES = (
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (8, b"WEBP", "image/webp"),
+    (8, b"WAVE", "audio/wav"),
+    (8, b"AVI ", "video/x-msvideo"),
+    (0, b"II*\x00", "image/tiff"),
+    (0, b"MM\x00*", "image/tiff"),
+    (0, b"\x00\x00\x01\x00", "image/x-icon"),
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"SQLite format 3\x00", "application/vnd.sqlite3"),
+    (0, b"PK\x03\x04", "application/zip"),
+    (0, b"PK\x05\x06", "application/zip"),
+    (0, b"\x1f\x8b", "application/gzip"),
+    (0, b"BZh", "application/x-bzip2"),
+    (0, b"\xfd7zXZ\x00", "application/x-xz"),
+    (0, b"(\xb5/\xfd", "application/zstd"),
+    (0, b"7z\xbc\xaf'\x1c", "application/x-7z-compressed"),
+    (0, b"Rar!\x1a\x07", "application/vnd.rar"),
+    (257, b"ustar", "application/x-tar"),
+    (0, b"\x7fELF", "application/x-executable"),
+    (0, b"MZ", "application/x-msdownload"),
+    (0, b"\xca\xfe\xba\xbe", "application/java-vm"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),
+    (0, b"ID3", "audio/mpeg"),
+    (0, b"\xff\xfb", "audio/mpeg"),
+    (0, b"OggS", "audio/ogg"),
+    (0, b"fLaC", "audio/flac"),
+    (4, b"ftyp", "video/mp4"),
+    (0, b"\x1aE\xdf\xa3", "video/webm"),
+)
+
+# declared types kept when data matches a generic container signature
+COMPATIBLE_CONTENT_TYPES = {
+    "application/zip": {
+        "application/epub+zip",
+        "application/java-archive",
+        "application/vnd.android.package-archive",
+        "application/vnd.oasis.opendocument.presentation",
+        "application/vnd.oasis.opendocument.spreadsheet",
+        "application/vnd.oasis.opendocument.text",
+        "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        "application/x-zip-compressed",
+    },
+    "application/gzip": {"application/x-gzip", "application/x-tar+gzip"},
+    "application/x-ole-storage": {"application/msword", "application/vnd.ms-excel", "application/vnd.ms-powerpoint"},
+    "audio/mpeg": {"audio/mp3"},
+    "video/mp4": {"audio/mp4", "audio/x-m4a", "image/avif", "image/heic", "image/heif", "video/quicktime", "video/3gpp"},
+    "video/webm": {"audio/webm", "video/x-matroska"},
+}
+
+# declared types kept for text data, other text types, e.g. HTML or SVG, could run scripts when served inline
+TEXT_CONTENT_TYPES = {
+    "application/json",
+    "text/csv",
+    "text/markdown",
+    "text/plain",
+    "text/tab-separated-values",
+}
+
+# bytes that do not occur in text files, same heuristic as file(1) uses
+BINARY_BYTES = bytes(set(range(32)) - {7, 8, 9, 10, 12, 13, 27})
+
+
+def sniff_content_type(head, declared_type=""):
+    """
+    Detects content type from the first bytes of the file. Declared type is kept
+    only if it is a more specific type of the detected data, e.g. docx for zip data,
+    or a text type that is safe to serve inline.
+    """
+    for offset, magic, content_type in SIGNATURES:
+        if head[offset : offset + len(magic)] == magic:
+            if declared_type in COMPATIBLE_CONTENT_TYPES.get(content_type, ()):
+                return declared_type
+            return content_type
+    if head.startswith((b"\xef\xbb\xbf", b"\xff\xfe", b"\xfe\xff")) or head.translate(None, BINARY_BYTES) == head:
+        return declared_type if declared_type in TEXT_CONTENT_TYPES else "text/plain"
+    return "application/octet-stream"
+
+
+def matches_content_type(content_type, patterns):
+    """
+    Checks whether content type matches any of the patterns, patterns ending with "/" match the whole group
+    """
+    return any(content_type == pattern or pattern.endswith("/") and content_type.startswith(pattern) for pattern in patterns)
+
+
+def is_content_type_allowed(content_type):
+    """
+    Checks upload content type against allowed and denied types
+    """
+    if matches_content_type(content_type, settings.UPLOAD_DENIED_CONTENT_TYPES):
+        return False
+    return not settings.UPLOAD_ALLOWED_CONTENT_TYPES or matches_content_type(content_type, settings.UPLOAD_ALLOWED_CONTENT_TYPES)
@@ -0,0 +1,230 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+MICROSECONDS = 1000000
+
+
+def now_us():
+    """
+    Returns monotonic-enough wall clock time in microseconds, comparable between workers
+    """
+    return int(time.time() * MICROSECONDS)
+
+
+class LocalBucketBackend:
+    """
+    Stores buckets in process memory, limits are enforced per worker process.
+    At most max_buckets are kept, the least recently used bucket is dropped to make room for a new one.
+    """
+
+    max_buckets = 100000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tats = OrderedDict()
+
+    def get(self, key):
+        """
+        Returns theoretical arrival time of the bucket
+        """
+        return self._tats.get(key)
+
+    def advance(self, key, increment, now, timeout):  # pylint: disable=unused-argument
+        """
+        Moves theoretical arrival time of the bucket by increment, starting not earlier than now
+        """
+        with self._lock:
+            tat = max(self._tats.get(key) or 0, now) + increment
+            self._tats[key] = tat
+            self._tats.move_to_end(key)
+            while len(self._tats) > self.max_buckets:
+                self._tats.popitem(last=False)
+            return tat
+
+    def retreat(self, key, increment):
+        """
+        Returns tokens consumed by rejected request
+        """
+        with self._lock:
+            if key in self._tats:
+                self._tats[key] -= increment
+
+
+class CacheBucketBackend:
+    """
+    Stores buckets in the default cache as counters shared by all workers.
+    Counters are only changed by atomic increments, so concurrent requests are not lost,
+    except for the reset of an idle bucket which may forgive a few concurrent requests.
+    """
+
+    prefix = "throttle:"
+
+    def get(self, key):
+        """
+        Returns theoretical arrival time of the bucket
+        """
+        return cache.get(self.prefix + key)
+
+    def advance(self, key, increment, now, timeout):
+        """
+        Moves theoretical arrival time of the bucket by increment, starting not earlier than now
+        """
+        key = self.prefix + key
+        if cache.add(key, now + increment, timeout):
+            return now + increment
+        try:
+            tat = cache.incr(key, increment)
+        except ValueError:
+            cache.set(key, now + increment, timeout)
+            return now + increment
+        if tat - increment < now:
+            tat = now + increment
+            cache.set(key, tat, timeout)
+        return tat
+
+    def retreat(self, key, increment):
+        """
+        Returns tokens consumed by rejected request
+        """
+        try:
+            cache.decr(self.prefix + key, increment)
+        except ValueError:
+            pass
+
+
+local_backend = LocalBucketBackend()
+cache_backend = CacheBucketBackend()
+
+
+def get_backend():
+    """
+    Returns configured bucket backend
+    """
+    return cache_backend if settings.THROTTLE_BACKEND == "cache" else local_backend
+
+
+class TokenBucket:
+    """
+    Token bucket refilled with rate tokens per second up to capacity, implemented as
+    generic cell rate algorithm: bucket state is a single theoretical arrival time.
+    """
+
+    def __init__(self, key, rate, capacity):
+        self.key = key
+        self.interval = MICROSECONDS / rate
+        self.burst = int(capacity * self.interval)
+        self.backend = get_backend()
+
+    def consume(self, amount, allow_debt=False):
+        """
+        Takes amount of tokens and returns seconds to wait until they are available.
+        Without debt tokens are not taken if they are not available yet.
+        """
+        increment = int(amount * self.interval)
+        now = now_us()
+        tat = self.backend.advance(self.key, increment, now, timeout=(self.burst + increment) // MICROSECONDS + 60)
+        wait = (tat - now - self.burst) / MICROSECONDS
+        if wait > 0 and not allow_debt:
+            self.backend.retreat(self.key, increment)
+        return max(wait, 0)
+
+    def get_wait(self):
+        """
+        Returns seconds until the bucket is out of debt
+        """
+        tat = self.backend.get(self.key) or 0
+        return max((tat - now_us() - self.burst) / MICROSECONDS, 0)
+
+
+def get_client_key(request):
+    """
+    Returns bucket key of authenticated user or client address
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{BaseThrottle().get_ident(request)}"
+
+
+def get_download_buckets(request, file_obj):
+    """
+    Returns bandwidth buckets of the client and of the file link, limits set to 0 are disabled
+    """
+    buckets = []
+    if settings.USER_DOWNLOAD_RATE:
+        buckets.append(TokenBucket(f"download:{get_client_key(request)}", settings.USER_DOWNLOAD_RATE, settings.BANDWIDTH_BURST))
+    if settings.LINK_DOWNLOAD_RATE:
+        buckets.append(TokenBucket(f"download:link:{file_obj.pk}", settings.LINK_DOWNLOAD_RATE, settings.BANDWIDTH_BURST))
+    return buckets
+
+
+def iter_throttled(chunks, buckets):
+    """
+    Yields chunks no faster than all buckets allow, charging them once per FILE_CHUNK_SIZE bytes
+    """
+    pending = 0
+    for chunk in chunks:
+        pending += len(chunk)
+        if pending >= settings.FILE_CHUNK_SIZE:
+            wait = max(bucket.consume(pending, allow_debt=True) for bucket in buckets)
+            pending = 0
+            if wait:
+                time.sleep(wait)
+        yield chunk
+
+
+def throttle_response(response, buckets):
+    """
+    Limits bandwidth of streaming response by the buckets
+    """
+    if buckets:
+        response.streaming_content = iter_throttled(response.streaming_content, buckets)
+    return response
+
+
+class RequestRateThrottle(BaseThrottle):
+    """
+    Limits request rate of every user or anonymous client address
+    """
+
+    def __init__(self):
+        self.retry_after = None
+
+    def allow_request(self, request, view):
+        if not settings.USER_REQUEST_RATE:
+            return True
+        bucket = TokenBucket(f"requests:{get_client_key(request)}", settings.USER_REQUEST_RATE, settings.USER_REQUEST_BURST)
+        self.retry_after = bucket.consume(1)
+        return not self.retry_after
+
+    def wait(self):
+        return math.ceil(self.retry_after) if self.retry_after else None
+
+
+class UploadRateThrottle(BaseThrottle):
+    """
+    Limits upload bandwidth of every user. Request body is charged before it is read,
+    upload larger than the bucket runs into debt and delays the next uploads.
+    """
+
+    def __init__(self):
+        self.retry_after = None
+
+    def allow_request(self, request, view):
+        if not settings.USER_UPLOAD_RATE or request.method != "POST":
+            return True
+        bucket = TokenBucket(f"upload:{get_client_key(request)}", settings.USER_UPLOAD_RATE, settings.BANDWIDTH_BURST)
+        self.retry_after = bucket.get_wait()
+        if self.retry_after:
+            return False
+        bucket.consume(int(request.META.get("CONTENT_LENGTH") or 0), allow_debt=True)
+        return True
+
+    def wait(self):
+        return math.ceil(self.retry_after) if self.retry_after else None
@@ -0,0 +1,111 @@
+import os
+import tempfile
+
+from django.conf import settings
+
+THUMBNAIL_CONTENT_TYPES = {
+    "image/bmp",
+    "image/gif",
+    "image/jpeg",
+    "image/png",
+    "image/tiff",
+    "image/webp",
+}
+THUMBNAIL_FORMATS = (("jpg", "JPEG", "image/jpeg"), ("png", "PNG", "image/png"))
+
+
+def get_thumbnail_path(file_obj, size, extension):
+    """
+    Returns cache path of the file derivative
+    """
+    return os.path.join(settings.THUMBNAIL_CACHE_ROOT, f"{file_obj.url}-{size}.{extension}")
+
+
+def get_cached_thumbnail(file_obj, size):
+    """
+    Returns path and content type of cached derivative and marks it as recently used
+    """
+    for extension, _, content_type in THUMBNAIL_FORMATS:
+        path = get_thumbnail_path(file_obj, size, extension)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            continue
+        return path, content_type
+    return None
+
+
+def create_thumbnail(file_obj, size):
+    """
+    Builds derivative of the image no larger than configured size in both dimensions
+    """
+    # Pillow is imported on first use, so worker startup and file deletion do not load it
+    from PIL import Image, ImageOps  # pylint: disable=import-outside-toplevel
+
+    max_size = (settings.THUMBNAIL_SIZES[size], settings.THUMBNAIL_SIZES[size])
+    with Image.open(file_obj.file_data.path) as image:
+        image.draft("RGB", max_size)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(max_size)
+        if image.mode in ("RGBA", "LA", "P"):
+            extension, image_format, content_type = THUMBNAIL_FORMATS[1]
+        else:
+            extension, image_format, content_type = THUMBNAIL_FORMATS[0]
+            image = image.convert("RGB")
+        os.makedirs(settings.THUMBNAIL_CACHE_ROOT, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=settings.THUMBNAIL_CACHE_ROOT, suffix=".tmp", delete=False) as fh:
+            try:
+                image.save(fh, image_format)
+            except OSError:
+                os.remove(fh.name)
+                raise
+    path = get_thumbnail_path(file_obj, size, extension)
+    os.replace(fh.name, path)
+    evict_thumbnails()
+    return path, content_type
+
+
+def get_thumbnail(file_obj, size):
+    """
+    Returns path and content type of the file derivative, None if file is not a supported image
+    """
+    if file_obj.content_type not in THUMBNAIL_CONTENT_TYPES or file_obj.encoding:
+        return None
+    cached = get_cached_thumbnail(file_obj, size)
+    if cached:
+        return cached
+    from PIL import Image  # pylint: disable=import-outside-toplevel
+
+    try:
+        return create_thumbnail(file_obj, size)
+    except (Image.DecompressionBombError, OSError):
+        return None
+
+
+def evict_thumbnails():
+    """
+    Removes least recently used derivatives while cache is over its size limit
+    """
+    with os.scandir(settings.THUMBNAIL_CACHE_ROOT) as entries:
+        thumbnails = [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries if entry.is_file()]
+    cache_size = sum(size for _, size, _ in thumbnails)
+    for _, size, path in sorted(thumbnails):
+        if cache_size <= settings.THUMBNAIL_CACHE_MAX_SIZE:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        cache_size -= size
+
+
+def delete_thumbnails(file_obj):
+    """
+    Removes all cached derivatives of the file
+    """
+    for size in settings.THUMBNAIL_SIZES:
+        for extension, _, _ in THUMBNAIL_FORMATS:
+            try:
+                os.remove(get_thumbnail_path(file_obj, size, extension))
+            except FileNotFoundError:
+                pass
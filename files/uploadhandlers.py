@@ -0,0 +1,64 @@
+from django.core.files.uploadhandler import MemoryFileUploadHandler, SkipFile, TemporaryFileUploadHandler
+
+from .sniffing import SNIFF_SIZE, is_content_type_allowed, sniff_content_type
+
+
+class ContentTypeSniffingMixin:
+    """
+    Detects content type of uploaded file from its first chunk while it is streamed
+    and skips files of not allowed types before the rest of their data is stored.
+    Rejected files are listed in request.upload_rejections.
+    """
+
+    sniffed_type = None
+
+    def is_storing(self):
+        """
+        Checks whether this handler stores the data of the current file
+        """
+        return True
+
+    def new_file(self, *args, **kwargs):
+        """
+        Resets detected content type for the next file, before the handler can stop
+        the following handlers by raising StopFutureHandlers
+        """
+        self.sniffed_type = None
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        """
+        Sniffs the first chunk before it is stored
+        """
+        if start == 0 and self.is_storing():
+            self.sniff(raw_data[:SNIFF_SIZE])
+        return super().receive_data_chunk(raw_data, start)
+
+    def sniff(self, head):
+        """
+        Detects content type and rejects the file if it is not allowed
+        """
+        self.sniffed_type = sniff_content_type(head, self.content_type or "")
+        if not is_content_type_allowed(self.sniffed_type):
+            if not hasattr(self.request, "upload_rejections"):
+                self.request.upload_rejections = []
+            self.request.upload_rejections.append({"name": self.file_name, "error": f"File type '{self.sniffed_type}' is not allowed."})
+            raise SkipFile()
+
+    def file_complete(self, file_size):
+        """
+        Replaces declared content type of stored file with detected one
+        """
+        file_obj = super().file_complete(file_size)
+        if file_obj is not None:
+            file_obj.content_type = self.sniffed_type or sniff_content_type(b"", self.content_type or "")
+        return file_obj
+
+
+class SniffingMemoryFileUploadHandler(ContentTypeSniffingMixin, MemoryFileUploadHandler):
+    def is_storing(self):
+        return self.activated
+
+
+class SniffingTemporaryFileUploadHandler(ContentTypeSniffingMixin, TemporaryFileUploadHandler):
+    pass
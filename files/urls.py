@@ -1,9 +1,14 @@
 from django.urls import path
 
-from .views import FileCreateView, FileDestroyView, FileUpdateView
+from NetoCloud.lazy import lazy_view
 
 urlpatterns = [
-    path("files/", FileCreateView.as_view()),
-    path("files/update/<int:pk>/", FileUpdateView.as_view()),
-    path("files/delete/<int:pk>/", FileDestroyView.as_view()),
+    path("files/", lazy_view("files.views.FileCreateView")),
+    path("files/bulk/", lazy_view("files.views.FileBulkCreateView")),
+    path("files/search/", lazy_view("files.views.FileSearchView")),
+    path("files/copy/<int:pk>/", lazy_view("files.views.FileCopyView")),
+    path("files/share/<int:pk>/", lazy_view("files.views.FileShareView")),
+    path("files/share/revoke/<int:pk>/", lazy_view("files.views.FileShareRevokeView")),
+    path("files/update/<int:pk>/", lazy_view("files.views.FileUpdateView")),
+    path("files/delete/<int:pk>/", lazy_view("files.views.FileDestroyView")),
 ]
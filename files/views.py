@@ -1,24 +1,113 @@
 import os
+import time
 
 from django.conf import settings
-from django.http import HttpResponse
-from django.utils import timezone
-from rest_framework import generics, status
-from rest_framework.permissions import IsAuthenticated
+from django.core import signing
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import generics, serializers, status
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from api.metrics import DISK_READ_BYTES
+from api.mixins import ReplicaReadMixin
+
+from .analytics import access_log
+from .compression import accepts_encoding, iter_file_chunks
 from .models import File
+from .pagination import FilePagination
 from .permissions import IsStaffOrOwnerPermission
-from .serializers import FileSerializer, FileUpdateSerializer
+from .search import search_files
+from .serializers import (
+    FileBulkSerializer,
+    FileCopySerializer,
+    FileSerializer,
+    FileShareSerializer,
+    FileUpdateSerializer,
+    get_rejection_results,
+)
+from .sharing import get_shared_file, is_share_token_valid, load_share_token, revoke_share_links
+from .throttling import RequestRateThrottle, UploadRateThrottle, get_download_buckets, throttle_response
+from .thumbnails import get_thumbnail
+
+
+def get_file_response(request, file_obj, file_path, disposition):
+    """
+    Returns response with stored file content. Compressed file is sent as is if client accepts its encoding.
+    """
+    if not file_obj.encoding or accepts_encoding(request, file_obj.encoding):
+        response = FileResponse(open(file_path, "rb"), content_type=file_obj.content_type)  # pylint: disable=consider-using-with
+        if file_obj.encoding:
+            response["Content-Encoding"] = file_obj.encoding
+        DISK_READ_BYTES.inc(int(response.get("Content-Length", 0)))
+    else:
+        response = StreamingHttpResponse(iter_file_chunks(file_obj), content_type=file_obj.content_type)
+        response["Content-Length"] = file_obj.size
+    if file_obj.encoding:
+        patch_vary_headers(response, ["Accept-Encoding"])
+    response["Content-Disposition"] = f"{disposition}; filename={file_obj.name}"
+    access_log.record(file_obj, int(response.get("Content-Length", 0)), downloaded=disposition == "attachment")
+    return throttle_response(response, get_download_buckets(request, file_obj))
 
 
 class FileCreateView(generics.CreateAPIView):
     queryset = File.objects.all()
     serializer_class = FileSerializer
     permission_classes = [IsAuthenticated]
+    throttle_classes = [RequestRateThrottle, UploadRateThrottle]
+
+
+class FileBulkCreateView(generics.CreateAPIView):
+    queryset = File.objects.all()
+    serializer_class = FileBulkSerializer
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [RequestRateThrottle, UploadRateThrottle]
+
+    def create(self, request, *args, **kwargs):
+        if not request.FILES and getattr(request, "upload_rejections", None):
+            return Response(get_rejection_results(request), status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+        if any(result.get("created") for result in results):
+            return Response(results, status=status.HTTP_201_CREATED)
+        return Response(results, status=status.HTTP_400_BAD_REQUEST)
+
+
+class FileCopyView(generics.CreateAPIView):
+    queryset = File.objects.select_related("storage")
+    serializer_class = FileCopySerializer
+    permission_classes = [IsStaffOrOwnerPermission]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["source"] = self.get_object()
+        return context
+
+
+class FileSearchView(generics.ListAPIView):
+    queryset = File.objects.all()
+    serializer_class = FileSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = FilePagination
+
+    def get_queryset(self):
+        query = self.request.query_params.get("q", "").strip()
+        if not query:
+            raise serializers.ValidationError({"q": ["This query parameter is required."]})
+        queryset = super().get_queryset()
+        storage = self.request.query_params.get("storage")
+        if storage and self.request.user.is_staff:
+            if not storage.isdigit():
+                raise serializers.ValidationError({"storage": ["A valid integer is required."]})
+            queryset = queryset.filter(storage_id=storage)
+        else:
+            queryset = queryset.filter(storage__owner=self.request.user)
+        return search_files(queryset, query)
 
 
-class FileDownloadView(generics.RetrieveAPIView):
+class FileDownloadView(ReplicaReadMixin, generics.RetrieveAPIView):
     queryset = File.objects.all()
     serializer_class = FileSerializer
     lookup_field = "url"
@@ -26,18 +115,73 @@ class FileDownloadView(generics.RetrieveAPIView):
     def get(self, request, *args, **kwargs):
         request_url = request.get_full_path()
         is_download = request_url.split("/")[1] == "download"
+        size = None if is_download else request.query_params.get("size")
+        if size and size not in settings.THUMBNAIL_SIZES:
+            return Response(
+                {"size": [f"Invalid size. Available sizes: {', '.join(settings.THUMBNAIL_SIZES)}."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         file_obj = self.get_object()
+        thumbnail = get_thumbnail(file_obj, size) if size else None
+        if thumbnail:
+            thumbnail_path, content_type = thumbnail
+            response = FileResponse(open(thumbnail_path, "rb"), content_type=content_type)  # pylint: disable=consider-using-with
+            response["Content-Disposition"] = f"inline; filename={file_obj.name}"
+            DISK_READ_BYTES.inc(int(response.get("Content-Length", 0)))
+            access_log.record(file_obj, int(response.get("Content-Length", 0)))
+            return response
         file_path = os.path.join(settings.MEDIA_ROOT, *file_obj.file_data.name.split("/"))
         if os.path.exists(file_path):
-            if is_download:
-                file_obj.last_download = timezone.now()
-                file_obj.save()
-            with open(file_path, "rb") as fh:
-                response = HttpResponse(fh.read(), content_type=file_obj.content_type)
-                response["Content-Disposition"] = f"{'attachment' if is_download else 'inline'}; filename={file_obj.name}"
-                return response
-        else:
+            return get_file_response(request, file_obj, file_path, "attachment" if is_download else "inline")
+        return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+
+
+class FileShareView(generics.CreateAPIView):
+    queryset = File.objects.all()
+    serializer_class = FileShareSerializer
+    permission_classes = [IsStaffOrOwnerPermission]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["file"] = self.get_object()
+        return context
+
+
+class FileShareRevokeView(generics.GenericAPIView):
+    queryset = File.objects.all()
+    serializer_class = FileSerializer
+    permission_classes = [IsStaffOrOwnerPermission]
+
+    def post(self, request, *args, **kwargs):
+        """
+        Revokes all share links of the file
+        """
+        revoke_share_links(self.get_object())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class FileShareDownloadView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, token):
+        """
+        Serves shared file without database queries, revocation check reads share version from the shared cache
+        and from database only on cache miss
+        """
+        try:
+            payload = load_share_token(token)
+        except signing.BadSignature:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not is_share_token_valid(payload):
+            return Response({"detail": "Share link has expired or was revoked."}, status=status.HTTP_410_GONE)
+        file_obj = get_shared_file(payload)
+        file_path = os.path.join(settings.MEDIA_ROOT, *file_obj.file_data.name.split("/"))
+        if not os.path.exists(file_path):
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        response = get_file_response(request, file_obj, file_path, "attachment" if payload["p"] == "download" else "inline")
+        patch_cache_control(response, public=True, max_age=min(payload["x"] - int(time.time()), settings.SHARE_LINK_CACHE_MAX_AGE))
+        return response
 
 
 class FileUpdateView(generics.UpdateAPIView):
@@ -0,0 +1,44 @@
+"""
+Gunicorn configuration, loaded by gunicorn from the working directory.
+
+Application is imported and warmed up once in the master process, workers are forked
+from it and share its memory pages until they write to them.
+"""
+
+import gc
+import os
+
+preload_app = True
+
+# downloads are streamed and may be slowed down by bandwidth throttling, threaded workers keep serving
+# other requests and answer heartbeats meanwhile, so a long download does not hit the worker timeout
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+# garbage collection during warm-up would free objects between the ones shared with workers,
+# so it is disabled until the warmed up objects are frozen
+gc.disable()
+
+
+def when_ready(server):
+    """
+    Warms up preloaded application before the first workers are forked
+    """
+    from NetoCloud.warmup import warm_up  # pylint: disable=import-outside-toplevel
+
+    warm_up()
+    # collections in master and workers skip frozen objects and do not write to their shared pages
+    gc.freeze()
+    gc.enable()
+    server.log.info("Application is warmed up, %s objects are shared with workers", gc.get_freeze_count())
+
+
+def child_exit(server, worker):  # pylint: disable=unused-argument
+    """
+    Removes live gauges of exited worker from multiprocess metrics
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess  # pylint: disable=import-outside-toplevel
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class StorageConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "storage"
+
+    def ready(self):
+        from . import quotas  # pylint: disable=import-outside-toplevel,unused-import
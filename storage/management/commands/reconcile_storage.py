@@ -0,0 +1,125 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from files.blobs import iter_blobs
+from files.folders import rebuild_folders
+from files.models import File
+from storage.models import Storage
+
+
+class Command(BaseCommand):
+    help = "Recomputes storage files_count and files_size and finds missing and orphaned files in MEDIA_ROOT"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="save recomputed counters")
+        parser.add_argument("--batch-size", type=int, default=500, help="storages processed per batch")
+        parser.add_argument("--checkpoint", help="file to resume from and to save progress to")
+        parser.add_argument("--skip-disk", action="store_true", help="do not walk MEDIA_ROOT")
+
+    def handle(self, *args, **options):
+        last_pk = self.load_checkpoint(options["checkpoint"])
+        totals = {"storages": 0, "counters": 0, "missing": 0, "orphaned": 0, "size_mismatches": 0}
+        while True:
+            with transaction.atomic():
+                storages = Storage.objects.select_related("owner").filter(pk__gt=last_pk).order_by("pk")[: options["batch_size"]]
+                if options["fix"]:
+                    storages = storages.select_for_update(of=("self",))
+                storages = list(storages)
+                if not storages:
+                    break
+                totals["counters"] += self.reconcile_counters(storages, options["fix"])
+            if not options["skip_disk"]:
+                for key, value in self.reconcile_disk(storages, options["verbosity"]).items():
+                    totals[key] += value
+            totals["storages"] += len(storages)
+            last_pk = storages[-1].pk
+            self.save_checkpoint(options["checkpoint"], last_pk)
+
+        if options["checkpoint"] and os.path.exists(options["checkpoint"]):
+            os.remove(options["checkpoint"])
+        self.stdout.write(
+            f"Checked {totals['storages']} storages: {totals['counters']} with wrong counters "
+            f"({'fixed' if options['fix'] else 'not fixed'}), {totals['missing']} missing files, "
+            f"{totals['orphaned']} orphaned files, {totals['size_mismatches']} size mismatches"
+        )
+
+    def load_checkpoint(self, path):
+        """
+        Returns pk of the last reconciled storage
+        """
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)["last_pk"]
+
+    def save_checkpoint(self, path, last_pk):
+        """
+        Saves pk of the last reconciled storage
+        """
+        if not path:
+            return
+        with open(f"{path}.tmp", "w", encoding="utf-8") as fh:
+            json.dump({"last_pk": last_pk}, fh)
+        os.replace(f"{path}.tmp", path)
+
+    def reconcile_counters(self, storages, fix):
+        """
+        Compares storage counters with one grouped aggregate query over the batch,
+        folder totals of the batch are rebuilt when fixing. Returns number of storages with wrong counters.
+        """
+        aggregates = {
+            row["storage_id"]: row
+            for row in File.objects.filter(storage__in=storages)
+            .order_by()
+            .values("storage_id")
+            .annotate(files_count=Count("pk"), files_size=Sum("size"))
+        }
+        wrong = []
+        for storage in storages:
+            aggregate = aggregates.get(storage.pk, {"files_count": 0, "files_size": 0})
+            if (storage.files_count, storage.files_size) == (aggregate["files_count"], aggregate["files_size"]):
+                continue
+            self.stdout.write(
+                f"Storage {storage.pk}: files_count {storage.files_count} -> {aggregate['files_count']}, "
+                f"files_size {storage.files_size} -> {aggregate['files_size']}"
+            )
+            storage.files_count = aggregate["files_count"]
+            storage.files_size = aggregate["files_size"]
+            wrong.append(storage)
+        if fix:
+            Storage.objects.bulk_update(wrong, ["files_count", "files_size"])
+            rebuild_folders(storages)
+        return len(wrong)
+
+    def reconcile_disk(self, storages, verbosity):
+        """
+        Compares stored files of the batch with owners' folders in MEDIA_ROOT
+        """
+        expected = {}
+        folders = {storage.owner.username for storage in storages}
+        files = File.objects.filter(storage__in=storages).values_list("file_data", "stored_size", "size")
+        for name, stored_size, size in files.iterator():
+            expected[name] = size if stored_size is None else stored_size
+            folders.add(name.split("/")[0])
+
+        result = {"missing": 0, "orphaned": 0, "size_mismatches": 0}
+        found = set()
+        for folder in folders:
+            for name, entry in iter_blobs(folder):
+                if name not in expected:
+                    result["orphaned"] += 1
+                    if verbosity >= 2:
+                        self.stdout.write(f"Orphaned file: {name}")
+                    continue
+                found.add(name)
+                if entry.stat().st_size != expected[name]:
+                    result["size_mismatches"] += 1
+                    self.stdout.write(f"Size mismatch: {name}, {entry.stat().st_size} bytes on disk, {expected[name]} expected")
+        for name in expected.keys() - found:
+            result["missing"] += 1
+            self.stdout.write(f"Missing file: {name}")
+        return result
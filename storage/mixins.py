@@ -0,0 +1,19 @@
+import datetime
+
+from rest_framework import serializers
+
+
+class DateRangeFilterMixin:
+    def filter_by_date(self, queryset):
+        """
+        Filters queryset by optional date_from and date_to query params
+        """
+        for param, lookup in (("date_from", "date__gte"), ("date_to", "date__lte")):
+            value = self.request.query_params.get(param)
+            if not value:
+                continue
+            try:
+                queryset = queryset.filter(**{lookup: datetime.date.fromisoformat(value)})
+            except ValueError as err:
+                raise serializers.ValidationError({param: ["Invalid date format. Example: '2023-11-01'."]}) from err
+        return queryset
@@ -6,15 +6,43 @@ from django.dispatch import receiver
 User = get_user_model()
 
 
+class Plan(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    max_size = models.PositiveBigIntegerField()
+
+    class Meta:
+        ordering = ("max_size", "pk")
+
+    def __str__(self) -> str:
+        return self.name
+
+
 class Storage(models.Model):
     owner = models.OneToOneField(User, on_delete=models.CASCADE, related_name="storage")
+    plan = models.ForeignKey(Plan, on_delete=models.SET_NULL, blank=True, null=True, related_name="storages")
+    max_size = models.PositiveBigIntegerField(blank=True, null=True)
     files_count = models.PositiveIntegerField(default=0)
-    files_size = models.PositiveIntegerField(default=0)
+    files_size = models.PositiveBigIntegerField(default=0)
+    change_seq = models.PositiveBigIntegerField(default=0)
 
     def __str__(self) -> str:
         return self.pk
 
 
+class StorageAccessDaily(models.Model):
+    storage = models.ForeignKey(Storage, on_delete=models.CASCADE, related_name="access_rollups")
+    date = models.DateField()
+    downloads = models.PositiveIntegerField(default=0)
+    bytes_served = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        ordering = ("-date", "storage")
+        constraints = [models.UniqueConstraint(fields=["storage", "date"], name="unique_storage_access_date")]
+
+    def __str__(self) -> str:
+        return f"{self.storage_id} {self.date}"
+
+
 @receiver(post_save, sender=User)
 def user_create(sender, instance, using, **kwargs):
     """
@@ -0,0 +1,80 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Plan
+
+
+class PlanCache:
+    """
+    In-process cache of plan sizes. It is cleared when a plan is changed in this process,
+    other worker processes pick changes up after QUOTA_CACHE_TTL seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sizes = None
+        self._expires = 0
+
+    def get(self, plan_id):
+        """
+        Returns max size of the plan, loading all plans with one query when cache is empty or expired
+        """
+        with self._lock:
+            if self._sizes is None or time.monotonic() >= self._expires:
+                self._sizes = dict(Plan.objects.values_list("pk", "max_size"))
+                self._expires = time.monotonic() + settings.QUOTA_CACHE_TTL
+            return self._sizes.get(plan_id)
+
+    def clear(self):
+        """
+        Drops cached plans
+        """
+        with self._lock:
+            self._sizes = None
+
+
+plan_cache = PlanCache()
+
+
+def get_max_size(storage):
+    """
+    Returns quota of the storage: its own limit, limit of its plan or default STORAGE_MAX_SIZE
+    """
+    if storage.max_size is not None:
+        return storage.max_size
+    if storage.plan_id is not None:
+        max_size = plan_cache.get(storage.plan_id)
+        if max_size is not None:
+            return max_size
+    return settings.STORAGE_MAX_SIZE
+
+
+def format_size(size):
+    """
+    Returns size in bytes in decimal units, e.g. "500 MB" or "1.5 GB"
+    """
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1000:
+            return f"{round(size, 2):g} {unit}"
+        size /= 1000
+    return f"{round(size, 2):g} TB"
+
+
+def get_quota_error(max_size):
+    """
+    Returns error message of exceeded quota
+    """
+    return f"User's storage is limited with max files_size value of {format_size(max_size)}"
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+def plan_change(sender, instance, using, **kwargs):
+    """
+    Invalidates cached plans after plan was changed
+    """
+    plan_cache.clear()
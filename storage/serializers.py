@@ -1,10 +1,10 @@
-from django.conf import settings
 from rest_framework import serializers
 
 from files.serializers import FileSerializer
 from user.serializers import UserSerializer, UserSerializerAdmin
 
-from .models import Storage
+from .models import Plan, Storage, StorageAccessDaily
+from .quotas import get_max_size
 
 
 class StorageListSerializer(serializers.ModelSerializer):
@@ -19,20 +19,46 @@ class StorageListSerializer(serializers.ModelSerializer):
         """
         Returns data for max_size field
         """
-        return settings.STORAGE_MAX_SIZE
+        return get_max_size(obj)
 
 
 class StorageRetrieveSerializer(serializers.ModelSerializer):
     owner = UserSerializer(read_only=True)
     files = FileSerializer(many=True)
     max_size = serializers.SerializerMethodField(read_only=True)
+    cursor = serializers.IntegerField(source="change_seq", read_only=True)
 
     class Meta:
         model = Storage
-        fields = ["pk", "files_count", "files_size", "max_size", "owner", "files"]
+        fields = ["pk", "files_count", "files_size", "max_size", "cursor", "owner", "files"]
 
     def get_max_size(self, obj):
         """
         Returns data for max_size field
         """
-        return settings.STORAGE_MAX_SIZE
+        return get_max_size(obj)
+
+
+class StorageAccessDailySerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source="storage.owner.username", read_only=True)
+
+    class Meta:
+        model = StorageAccessDaily
+        fields = ["storage", "username", "date", "downloads", "bytes_served"]
+
+
+class PlanSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Plan
+        fields = ["pk", "name", "max_size"]
+
+
+class StorageQuotaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Storage
+        fields = ["pk", "plan", "max_size"]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data["effective_max_size"] = get_max_size(instance)
+        return data
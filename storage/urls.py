@@ -1,8 +1,16 @@
 from django.urls import path
 
-from .views import StorageListView, StorageRetrieveView
+from NetoCloud.lazy import lazy_view
 
 urlpatterns = [
-    path("storages/", StorageListView.as_view()),
-    path("storages/<int:pk>/", StorageRetrieveView.as_view()),
+    path("storages/", lazy_view("storage.views.StorageListView")),
+    path("storages/analytics/", lazy_view("storage.views.StorageAccessListView")),
+    path("storages/<int:pk>/", lazy_view("storage.views.StorageRetrieveView")),
+    path("storages/<int:pk>/archive/", lazy_view("storage.views.StorageArchiveView")),
+    path("storages/<int:pk>/analytics/", lazy_view("storage.views.FileAccessListView")),
+    path("storages/<int:pk>/changes/", lazy_view("storage.views.StorageChangesView")),
+    path("storages/<int:pk>/folders/", lazy_view("storage.views.StorageFolderView")),
+    path("storages/<int:pk>/quota/", lazy_view("storage.views.StorageQuotaView")),
+    path("plans/", lazy_view("storage.views.PlanListCreateView")),
+    path("plans/<int:pk>/", lazy_view("storage.views.PlanDetailView")),
 ]
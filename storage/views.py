@@ -1,19 +1,147 @@
-from rest_framework import generics
+from django.http import StreamingHttpResponse
+from rest_framework import generics, serializers, status
+from rest_framework.response import Response
 
+from api.mixins import ReplicaReadMixin
+from files.archive import stream_zip
+from files.folders import FolderListing
+from files.models import FileAccessDaily
+from files.pagination import FilePagination
+from files.serializers import (
+    PATH_PATTERN,
+    FileAccessDailySerializer,
+    FileChangeSerializer,
+    FileSerializer,
+    FolderSerializer,
+    validate_file_path,
+)
 from user.permissions import isStaffEditorPermission
 
-from .models import Storage
+from .mixins import DateRangeFilterMixin
+from .models import Plan, Storage, StorageAccessDaily
 from .permissions import IsStaffOrOwnerPermission
-from .serializers import StorageListSerializer, StorageRetrieveSerializer
+from .serializers import (
+    PlanSerializer,
+    StorageAccessDailySerializer,
+    StorageListSerializer,
+    StorageQuotaSerializer,
+    StorageRetrieveSerializer,
+)
 
 
-class StorageListView(generics.ListAPIView):
+class StorageListView(ReplicaReadMixin, generics.ListAPIView):
     queryset = Storage.objects.all()
     serializer_class = StorageListSerializer
     permission_classes = [isStaffEditorPermission]
 
 
-class StorageRetrieveView(generics.RetrieveAPIView):
+class PlanListCreateView(generics.ListCreateAPIView):
+    queryset = Plan.objects.all()
+    serializer_class = PlanSerializer
+    permission_classes = [isStaffEditorPermission]
+
+
+class PlanDetailView(generics.RetrieveUpdateDestroyAPIView):
+    queryset = Plan.objects.all()
+    serializer_class = PlanSerializer
+    permission_classes = [isStaffEditorPermission]
+
+
+class StorageQuotaView(generics.RetrieveUpdateAPIView):
+    queryset = Storage.objects.all()
+    serializer_class = StorageQuotaSerializer
+    permission_classes = [isStaffEditorPermission]
+
+
+class StorageAccessListView(DateRangeFilterMixin, generics.ListAPIView):
+    queryset = StorageAccessDaily.objects.select_related("storage__owner")
+    serializer_class = StorageAccessDailySerializer
+    permission_classes = [isStaffEditorPermission]
+
+    def get_queryset(self):
+        return self.filter_by_date(super().get_queryset())
+
+
+class FileAccessListView(DateRangeFilterMixin, generics.ListAPIView):
+    queryset = FileAccessDaily.objects.select_related("file")
+    serializer_class = FileAccessDailySerializer
+    permission_classes = [isStaffEditorPermission]
+
+    def get_queryset(self):
+        return self.filter_by_date(super().get_queryset().filter(file__storage_id=self.kwargs.get("pk")))
+
+
+class StorageRetrieveView(ReplicaReadMixin, generics.RetrieveAPIView):
     queryset = Storage.objects.all()
     serializer_class = StorageRetrieveSerializer
     permission_classes = [IsStaffOrOwnerPermission]
+
+
+class StorageArchiveView(generics.RetrieveAPIView):
+    queryset = Storage.objects.select_related("owner")
+    serializer_class = StorageRetrieveSerializer
+    permission_classes = [IsStaffOrOwnerPermission]
+
+    def get(self, request, *args, **kwargs):
+        prefix = request.query_params.get("path", "")
+        if prefix and not PATH_PATTERN.match(prefix) or "//" in prefix:
+            return Response(
+                {"error": "Invalid path format. Forbidden symbols: '.', '\\'. Example: 'home/folder/path/'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        storage = self.get_object()
+        files = storage.files.filter(path__startswith=prefix).iterator()
+        archive_name = prefix.rstrip("/").split("/")[-1] if prefix else storage.owner.username
+        response = StreamingHttpResponse(stream_zip(files, prefix), content_type="application/zip")
+        response["Content-Disposition"] = f"attachment; filename={archive_name}.zip"
+        return response
+
+
+class StorageChangesView(generics.RetrieveAPIView):
+    queryset = Storage.objects.all()
+    serializer_class = FileChangeSerializer
+    permission_classes = [IsStaffOrOwnerPermission]
+    default_limit = 500
+    max_limit = 1000
+
+    def get_int_param(self, name, default):
+        """
+        Returns non-negative integer query param
+        """
+        value = self.request.query_params.get(name)
+        if value is None:
+            return default
+        if not value.isdigit():
+            raise serializers.ValidationError({name: ["A valid non-negative integer is required."]})
+        return int(value)
+
+    def get(self, request, *args, **kwargs):
+        cursor = self.get_int_param("cursor", 0)
+        limit = min(self.get_int_param("limit", self.default_limit), self.max_limit) or self.default_limit
+        storage = self.get_object()
+        changes = list(storage.changes.filter(seq__gt=cursor).order_by("seq")[: limit + 1])
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        return Response(
+            {
+                "cursor": changes[-1].seq if changes else cursor,
+                "has_more": has_more,
+                "changes": self.get_serializer(changes, many=True).data,
+            }
+        )
+
+
+class StorageFolderView(ReplicaReadMixin, generics.RetrieveAPIView):
+    queryset = Storage.objects.all()
+    serializer_class = FileSerializer
+    permission_classes = [IsStaffOrOwnerPermission]
+    pagination_class = FilePagination
+
+    def get(self, request, *args, **kwargs):
+        prefix = validate_file_path(request.query_params.get("path", ""))
+        storage = self.get_object()
+        folders, files = self.paginate_queryset(FolderListing(storage, prefix))
+        response = self.get_paginated_response(self.get_serializer(files, many=True).data)
+        response.data["path"] = prefix
+        response.data["folders"] = FolderSerializer(folders, many=True).data
+        return response
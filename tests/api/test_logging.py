@@ -0,0 +1,80 @@
+import json
+import logging
+import logging.handlers
+
+import pytest
+
+from NetoCloud.log import JsonFormatter, QueueFileHandler, RequestContextFilter, request_context
+
+
+def test_queue_file_handler_json_record(tmp_path):
+    """
+    Log record is written to file by background thread as JSON with request context
+    """
+    handler = QueueFileHandler(tmp_path / "test.log", rotation="size", max_bytes=1000000, backup_count=1)
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(RequestContextFilter())
+    logger = logging.getLogger("tests.queue_file_handler")
+    logger.addHandler(handler)
+    token = request_context.set({"request_id": "test_request", "user_id": 1})
+    try:
+        logger.warning("uploaded %s", "file.txt", extra={"bytes_in": 100})
+    finally:
+        request_context.reset(token)
+        logger.removeHandler(handler)
+        handler.close()
+    record = json.loads((tmp_path / "test.log").read_text())
+    assert record.get("message") == "uploaded file.txt"
+    assert record.get("level") == "WARNING"
+    assert record.get("request_id") == "test_request"
+    assert record.get("user_id") == 1
+    assert record.get("bytes_in") == 100
+
+
+def test_queue_file_handler_drops_records(tmp_path):
+    """
+    Records that do not fit into the queue are dropped and counted
+    """
+    handler = QueueFileHandler(tmp_path / "test.log", queue_size=1)
+    handler.stop_listener()
+    for i in range(3):
+        handler.handle(logging.makeLogRecord({"msg": f"record {i}"}))
+    assert handler.dropped == 2
+    handler.close()
+
+
+def test_queue_file_handler_restart_listener(tmp_path):
+    """
+    Forked process writes records by its own background thread
+    """
+    handler = QueueFileHandler(tmp_path / "test.log")
+    listener = handler.listener
+    handler.handle(logging.makeLogRecord({"msg": "forked", "levelno": logging.INFO}))
+    handler.restart_listener()
+    assert handler.listener is not listener
+    listener.stop()
+    handler.handle(logging.makeLogRecord({"msg": "after fork", "levelno": logging.INFO}))
+    handler.close()
+    assert (tmp_path / "test.log").read_text().splitlines() == ["forked", "after fork"]
+
+
+def test_queue_file_handler_stopped_listener(tmp_path):
+    """
+    Stopped background thread is neither restarted after fork nor stopped again on close
+    """
+    handler = QueueFileHandler(tmp_path / "test.log")
+    assert isinstance(handler.target, logging.handlers.WatchedFileHandler)
+    handler.stop_listener()
+    listener = handler.listener
+    handler.restart_listener()
+    assert handler.listener is listener
+    handler.close()
+
+
+@pytest.mark.django_db
+def test_request_id_header(client):
+    """
+    Request id is returned in response header
+    """
+    response = client.get("/api/v1/storages/", HTTP_X_REQUEST_ID="test_request")
+    assert response["X-Request-ID"] == "test_request"
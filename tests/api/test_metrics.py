@@ -0,0 +1,46 @@
+import pytest
+
+
+@pytest.mark.django_db
+def test_metrics_view(client, settings, jwt_token_admin_factory):
+    """
+    Get metrics of handled requests
+    """
+    settings.METRICS_TOKEN = "metrics_token"
+    user_data = jwt_token_admin_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    assert client.get("/api/v1/users/").status_code == 200
+    client.credentials(HTTP_AUTHORIZATION="Bearer metrics_token")
+    response = client.get("/metrics/")
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain")
+    content = response.content.decode()
+    assert 'netocloud_request_duration_seconds_count{method="GET",view="UserListCreateView"}' in content
+    assert 'netocloud_db_queries_per_request_count{view="UserListCreateView"}' in content
+    assert 'netocloud_requests_total{method="POST",status="201",view="UserListCreateView"}' in content
+
+
+@pytest.mark.django_db
+def test_metrics_view_token(client, settings):
+    """
+    Get metrics with and without metrics token
+    """
+    settings.METRICS_TOKEN = "metrics_token"
+    response = client.get("/metrics/")
+    assert response.status_code == 403
+    client.credentials(HTTP_AUTHORIZATION="Bearer metrics_token")
+    response = client.get("/metrics/")
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_metrics_view_no_token(client, settings):
+    """
+    Metrics are not served if metrics token is not configured
+    """
+    settings.METRICS_TOKEN = ""
+    response = client.get("/metrics/")
+    assert response.status_code == 403
+    client.credentials(HTTP_AUTHORIZATION="Bearer ")
+    response = client.get("/metrics/")
+    assert response.status_code == 403
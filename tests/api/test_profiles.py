@@ -0,0 +1,38 @@
+import pytest
+
+
+@pytest.mark.django_db
+def test_profile_request_admin_token(client, settings, jwt_token_admin_factory):
+    """
+    Profile request of admin user with profiling token
+    """
+    settings.PROFILING_TOKEN = "profiling_token"
+    user_data = jwt_token_admin_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    response = client.get(f"/api/v1/storages/{user_data.get('storage_id')}/", HTTP_X_PROFILE_TOKEN="profiling_token")
+    assert response.status_code == 200
+    response = client.get("/api/v1/profiles/")
+    assert response.status_code == 200
+    profile = response.json()[0]
+    assert profile.get("path") == f"/api/v1/storages/{user_data.get('storage_id')}/"
+    assert profile.get("user") == user_data.get("username")
+    assert "profile" not in profile
+    response = client.get(f"/api/v1/profiles/{profile.get('id')}/")
+    assert response.status_code == 200
+    data = response.json()
+    assert data.get("queries_count") == len(data.get("queries")) > 0
+    assert "cumulative" in data.get("profile")
+
+
+@pytest.mark.django_db
+def test_profile_request_regular_token(client, settings, jwt_token_regular_factory):
+    """
+    Profiling token of regular user is ignored
+    """
+    settings.PROFILING_TOKEN = "profiling_token"
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    response = client.get(f"/api/v1/users/{user_data.get('id')}/", HTTP_X_PROFILE_TOKEN="profiling_token")
+    assert response.status_code == 200
+    response = client.get("/api/v1/profiles/")
+    assert response.status_code == 403
@@ -0,0 +1,122 @@
+import runpy
+
+import pytest
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+from files.analytics import access_log
+from files.models import File
+from files.views import FileDownloadView
+from NetoCloud import settings as settings_module
+from NetoCloud.routers import ReplicaRouter, choose_replica, is_pinned, replica_reads
+from storage.models import Storage
+from user.models import User
+
+pytestmark = pytest.mark.usefixtures("clean_media")
+
+
+@pytest.fixture(name="replica_reads_log")
+def fixture_replica_reads_log(settings, monkeypatch):
+    """
+    Routes replica reads to the test database and records replica used by reads of every model
+    """
+    settings.DATABASE_REPLICAS = ["default"]
+    cache.clear()
+    log = []
+    db_for_read = ReplicaRouter.db_for_read
+
+    def logged_db_for_read(self, model, **hints):
+        log.append((model, replica_reads.get() is not None))
+        return db_for_read(self, model, **hints)
+
+    monkeypatch.setattr(ReplicaRouter, "db_for_read", logged_db_for_read)
+    return log
+
+
+def test_replica_router(settings):
+    """
+    Route reads to replicas only when replica reads are enabled, writes always to primary
+    """
+    router = ReplicaRouter()
+    settings.DATABASE_REPLICAS = ["replica_1", "replica_2"]
+    assert router.db_for_read(File) == "default"
+    token = replica_reads.set(choose_replica())
+    try:
+        replica = router.db_for_read(File)
+        assert replica in ("replica_1", "replica_2")
+        assert all(router.db_for_read(Storage) == replica for _ in range(20))
+        assert router.db_for_write(File) == "default"
+    finally:
+        replica_reads.reset(token)
+    settings.DATABASE_REPLICAS = []
+    assert choose_replica() is None
+
+
+@pytest.mark.django_db
+def test_replica_reads_storage_list(client, replica_reads_log, jwt_token_admin_factory):
+    """
+    List storages from replica, authenticated user is read from primary
+    """
+    user_data = jwt_token_admin_factory("test", "test@test.ru", "test_name")
+    replica_reads_log.clear()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    response = client.get("/api/v1/storages/")
+    assert response.status_code == 200
+    assert (User, False) in replica_reads_log
+    assert (Storage, True) in replica_reads_log
+    assert replica_reads.get() is None
+
+
+@pytest.mark.django_db
+def test_replica_reads_pinned_after_write(client, replica_reads_log, jwt_token_regular_factory):
+    """
+    Read storage from primary after upload of the user
+    """
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    user = User.objects.get(pk=user_data.get("id"))
+    assert not is_pinned(user)
+    with open("./requirements.txt", "rb") as file:
+        data = {"file_data": file, "name": "requirements.txt", "path": "home/test/"}
+        response = client.post("/api/v1/files/", data=data)
+        assert response.status_code == 201
+    assert is_pinned(user)
+    replica_reads_log.clear()
+    response = client.get(f"/api/v1/storages/{user_data.get('storage_id')}/")
+    assert response.status_code == 200
+    assert (Storage, True) not in replica_reads_log
+
+
+@pytest.mark.django_db
+def test_replica_download_falls_back_to_primary(client, replica_reads_log, monkeypatch, jwt_token_regular_factory):
+    """
+    Download file which has not reached the replica yet
+    """
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    with open("./requirements.txt", "rb") as file:
+        data = {"file_data": file, "name": "requirements.txt", "path": "home/test/"}
+        data = client.post("/api/v1/files/", data=data).json()
+    monkeypatch.setattr(FileDownloadView, "get_queryset", lambda self: File.objects.none() if replica_reads.get() else File.objects.all())
+    client.credentials(HTTP_AUTHORIZATION="")
+    replica_reads_log.clear()
+    response = client.get("/download" + data.get("url_path"))
+    assert response.status_code == 200
+    assert (File, False) in replica_reads_log
+    access_log.flush()
+    assert File.objects.get(pk=data.get("pk")).last_download is not None
+
+
+def test_replicas_require_shared_cache(monkeypatch):
+    """
+    Refuse to start with a per-process cache outside of debug mode, replica pins and share link revocations
+    would not reach other workers
+    """
+    monkeypatch.setenv("DEBUG", "")
+    for backend in ("django.core.cache.backends.locmem.LocMemCache", "django.core.cache.backends.dummy.DummyCache"):
+        monkeypatch.setenv("CACHE_BACKEND", backend)
+        with pytest.raises(ImproperlyConfigured):
+            runpy.run_path(settings_module.__file__)
+    monkeypatch.setenv("DB_REPLICAS", "replica.sqlite3")
+    monkeypatch.setenv("CACHE_BACKEND", "django.core.cache.backends.redis.RedisCache")
+    assert runpy.run_path(settings_module.__file__)["DATABASE_REPLICAS"] == ["replica_1"]
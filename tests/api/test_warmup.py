@@ -0,0 +1,55 @@
+import gc
+import logging
+import runpy
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.admin.models import ADDITION, LogEntry
+from django.contrib.auth.password_validation import get_default_password_validators
+from django.contrib.contenttypes.models import ContentType
+from django.urls import get_resolver
+
+from NetoCloud.lazy import LazyView
+from NetoCloud.warmup import iter_url_patterns, warm_up
+from user.models import User
+
+
+def test_warm_up(monkeypatch):
+    """
+    Warm up imports all views and builds URL resolver and password validators
+    """
+    views = [pattern.callback for pattern in iter_url_patterns(get_resolver().url_patterns) if isinstance(pattern.callback, LazyView)]
+    for view in views:
+        monkeypatch.setattr(view, "_view", None)
+    get_default_password_validators.cache_clear()
+    warm_up()
+    assert all(view._view is not None for view in views)  # pylint: disable=protected-access
+    assert get_resolver()._populated  # pylint: disable=protected-access
+    assert get_default_password_validators.cache_info().currsize == 1
+
+
+@pytest.mark.django_db
+def test_admin_installed_not_routed(client, user_factory):
+    """
+    Admin models are installed, so users with admin log entries can be deleted, admin site is not served by default
+    """
+    user = user_factory()
+    LogEntry.objects.create(user=user, content_type=ContentType.objects.get_for_model(User), object_repr="user", action_flag=ADDITION)
+    user.delete()
+    assert not LogEntry.objects.exists()
+    assert client.get("/admin/").status_code == 404
+
+
+def test_gunicorn_when_ready(monkeypatch):
+    """
+    Master process freezes warmed up objects and enables garbage collection again before forking workers
+    """
+    monkeypatch.setattr(gc, "freeze", lambda: None)
+    try:
+        config = runpy.run_path("gunicorn.conf.py")
+        assert config["worker_class"] == "gthread"
+        assert not gc.isenabled()
+        config["when_ready"](SimpleNamespace(log=logging.getLogger("tests.gunicorn")))
+        assert gc.isenabled()
+    finally:
+        gc.enable()
@@ -1,3 +1,5 @@
+import shutil
+
 import pytest
 from model_bakery import baker
 from rest_framework.test import APIClient
@@ -30,6 +32,23 @@ def file_factory():
     return factory
 
 
+@pytest.fixture(autouse=True)
+def manual_access_log_flush(settings):
+    """
+    Access log is flushed by tests themselves, background flush would write outside of test transaction
+    """
+    settings.ACCESS_LOG_FLUSH_INTERVAL = 3600
+
+
+@pytest.fixture
+def clean_media():
+    """
+    Deletes files created during testing
+    """
+    yield
+    shutil.rmtree("./media/test/", ignore_errors=True)
+
+
 @pytest.fixture
 def client():
     """
@@ -38,21 +57,33 @@ def client():
     return APIClient()
 
 
-@pytest.fixture()
-def jwt_token_admin_factory():
+@pytest.fixture(name="registration_data_factory")
+def fixture_registration_data_factory():
     """
-    JWT Admin Token Factory
+    Registration request data factory
     """
 
     def factory(username, email, full_name):
-        api_client = APIClient()
-        data = {
+        return {
             "username": username,
             "password": "testpassword!",
             "repeat_password": "testpassword!",
             "email": email,
             "full_name": full_name,
         }
+
+    return factory
+
+
+@pytest.fixture()
+def jwt_token_admin_factory(registration_data_factory):
+    """
+    JWT Admin Token Factory
+    """
+
+    def factory(username, email, full_name):
+        api_client = APIClient()
+        data = registration_data_factory(username, email, full_name)
         response = api_client.post("/api/v1/users/", data=data, format="json")
         user = User.objects.first()
         assert user is not None
@@ -74,20 +105,14 @@ def jwt_token_admin_factory():
 
 
 @pytest.fixture()
-def jwt_token_regular_factory():
+def jwt_token_regular_factory(registration_data_factory):
     """
     JWT Regular User Token Factory
     """
 
     def factory(username, email, full_name):
         api_client = APIClient()
-        data = {
-            "username": username,
-            "password": "testpassword!",
-            "repeat_password": "testpassword!",
-            "email": email,
-            "full_name": full_name,
-        }
+        data = registration_data_factory(username, email, full_name)
         response = api_client.post("/api/v1/users/", data=data, format="json")
         user = User.objects.first()
         assert user is not None
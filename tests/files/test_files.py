@@ -1,10 +1,23 @@
+import gzip
+import io
+import os
 import shutil
+import time
 
 import pytest
-from django.conf import settings
-
-from files.models import File
+from django.conf import settings as django_settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopFutureHandlers
+from django.db import models
+from PIL import Image
+
+from files import serializers, throttling
+from files.analytics import access_log
+from files.models import File, Folder
+from files.uploadhandlers import SniffingMemoryFileUploadHandler
 from storage.models import Storage
+from storage.quotas import get_quota_error
 from user.models import User
 
 
@@ -125,6 +138,8 @@ def test_download_uploaded_file(client, jwt_token_regular_factory):
     client.credentials(HTTP_AUTHORIZATION="")
     response = client.get("/download" + data.get("url_path"))
     assert response.status_code == 200
+    assert File.objects.get(pk=data.get("pk")).last_download is None
+    access_log.flush()
     assert File.objects.get(pk=data.get("pk")).last_download is not None
 
 
@@ -144,6 +159,7 @@ def test_show_uploaded_file(client, jwt_token_regular_factory):
     client.credentials(HTTP_AUTHORIZATION="")
     response = client.get(data.get("url_path"))
     assert response.status_code == 200
+    access_log.flush()
     assert File.objects.get(pk=data.get("pk")).last_download is None
 
 
@@ -309,7 +325,7 @@ def test_max_storage_files_size_constraint(client, file_factory, jwt_token_regul
     """
     user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
     storage = Storage.objects.get(id=user_data.get("storage_id"))
-    file = file_factory(storage=storage, size=settings.STORAGE_MAX_SIZE - 1, path="")
+    file = file_factory(storage=storage, size=django_settings.STORAGE_MAX_SIZE - 1, path="")
     client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
     with open("./requirements.txt", "rb") as file:
         data = {
@@ -320,4 +336,351 @@ def test_max_storage_files_size_constraint(client, file_factory, jwt_token_regul
         response = client.post("/api/v1/files/", data=data)
         assert response.status_code == 400
         data = response.json()
-        assert data == {"error": f"User's storage is limited with max files_size value of {settings.STORAGE_MAX_SIZE // 1000000000} GB"}
+        assert data == {"error": "User's storage is limited with max files_size value of 2 GB"}
+
+
+@pytest.mark.django_db
+def test_bulk_create_files_regular_token(client, jwt_token_regular_factory):
+    """
+    Upload many files in one request with regular token
+    """
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    with open("./requirements.txt", "rb") as file:
+        response = client.post("/api/v1/files/", data={"file_data": file, "name": "requirements.txt", "path": "home/"})
+        assert response.status_code == 201
+    with open("./requirements.txt", "rb") as file1, open("./requirements-dev.txt", "rb") as file2:
+        data = {"file_data": [file1, file2], "path": "home/", "note": "test_note"}
+        response = client.post("/api/v1/files/bulk/", data=data)
+    assert response.status_code == 201
+    data = response.json()
+    assert [result.get("created") for result in data] == [False, True]
+    assert data[0].get("error") == "File with path 'home/' and name 'requirements.txt' already exists."
+    assert data[1].get("file").get("name") == "requirements-dev.txt"
+    assert data[1].get("file").get("note") == "test_note"
+    storage = Storage.objects.get(id=user_data.get("storage_id"))
+    assert storage.files_count == 2
+    assert storage.files_size == File.objects.filter(storage=storage).aggregate(total=models.Sum("size")).get("total")
+    folder = Folder.objects.get(storage=storage, path="home/")
+    assert (folder.files_count, folder.files_size) == (storage.files_count, storage.files_size)
+
+
+@pytest.mark.django_db
+def test_create_compressed_file(client, settings, jwt_token_regular_factory):
+    """
+    Upload text file with compression enabled and download it with and without gzip support
+    """
+    settings.FILE_COMPRESSION = "gzip"
+    content = b"2023-11-01 INFO request served\n" * 1000
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    file = SimpleUploadedFile("server.log", content, content_type="text/plain")
+    response = client.post("/api/v1/files/", data={"file_data": file, "name": "server.log"})
+    assert response.status_code == 201
+    data = response.json()
+    file_obj = File.objects.get(pk=data.get("pk"))
+    assert file_obj.encoding == "gzip"
+    assert file_obj.size == len(content)
+    assert file_obj.stored_size < file_obj.size
+    assert Storage.objects.get(id=user_data.get("storage_id")).files_size == len(content)
+    with open(file_obj.file_data.path, "rb") as fh:
+        assert gzip.decompress(fh.read()) == content
+
+    response = client.get(data.get("url_path"), HTTP_ACCEPT_ENCODING="gzip, deflate")
+    assert response.status_code == 200
+    assert response["Content-Encoding"] == "gzip"
+    assert gzip.decompress(b"".join(response.streaming_content)) == content
+
+    response = client.get(data.get("url_path"))
+    assert response.status_code == 200
+    assert not response.has_header("Content-Encoding")
+    assert b"".join(response.streaming_content) == content
+
+
+@pytest.mark.django_db
+def test_show_uploaded_image_thumbnail(client, settings, tmp_path, jwt_token_regular_factory):
+    """
+    Show preview of uploaded image
+    """
+    settings.THUMBNAIL_CACHE_ROOT = str(tmp_path)
+    image_data = io.BytesIO()
+    Image.new("RGB", (2000, 1000), "red").save(image_data, "PNG")
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    file = SimpleUploadedFile("image.png", image_data.getvalue(), content_type="image/png")
+    response = client.post("/api/v1/files/", data={"file_data": file, "name": "image.png"})
+    assert response.status_code == 201
+    data = response.json()
+    client.credentials(HTTP_AUTHORIZATION="")
+
+    response = client.get(data.get("url_path") + "?size=small")
+    assert response.status_code == 200
+    assert response["Content-Type"] == "image/jpeg"
+    with Image.open(io.BytesIO(b"".join(response.streaming_content))) as thumbnail:
+        assert thumbnail.size == (settings.THUMBNAIL_SIZES["small"], settings.THUMBNAIL_SIZES["small"] // 2)
+    assert len(list(tmp_path.iterdir())) == 1
+
+    response = client.get(data.get("url_path") + "?size=huge")
+    assert response.status_code == 400
+
+    File.objects.get(pk=data.get("pk")).delete()
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.django_db
+def test_search_files_regular_token(client, user_factory, file_factory, jwt_token_regular_factory):
+    """
+    Search own files by name prefix, path and note
+    """
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    storage = Storage.objects.get(id=user_data.get("storage_id"))
+    file_factory(storage=storage, name="annual_report.pdf", path="docs/work/", content_type="application/pdf", size=100)
+    file_factory(storage=storage, name="reporting.txt", path="", note="quarterly report draft", content_type="text/plain", size=100)
+    file_factory(storage=storage, name="photo.png", path="images/", content_type="image/png", size=100)
+    file_factory(storage=user_factory().storage, name="report.pdf", path="docs/", content_type="application/pdf", size=100)
+
+    response = client.get("/api/v1/files/search/", {"q": "report"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data.get("count") == 2
+    assert {file.get("name") for file in data.get("results")} == {"annual_report.pdf", "reporting.txt"}
+
+    response = client.get("/api/v1/files/search/", {"q": "quart"})
+    assert [file.get("name") for file in response.json().get("results")] == ["reporting.txt"]
+
+    response = client.get("/api/v1/files/search/", {"q": "docs pdf"})
+    assert [file.get("name") for file in response.json().get("results")] == ["annual_report.pdf"]
+
+    response = client.get("/api/v1/files/search/", {"q": "image", "page_size": 1})
+    assert response.json().get("count") == 1
+
+    response = client.get("/api/v1/files/search/", {"q": "  "})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_copy_uploaded_file_regular_token(client, user_factory, file_factory, jwt_token_regular_factory):
+    """
+    Copy uploaded file to other folder with regular token
+    """
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    with open("./requirements.txt", "rb") as file:
+        response = client.post("/api/v1/files/", data={"file_data": file, "name": "requirements.txt", "note": "test_note"})
+    source = File.objects.get(pk=response.json().get("pk"))
+
+    response = client.post(f"/api/v1/files/copy/{source.pk}/", data={"path": "home/"})
+    assert response.status_code == 201
+    data = response.json()
+    assert data.get("name") == "requirements.txt"
+    assert data.get("path") == "home/"
+    assert data.get("note") == "test_note"
+    copy = File.objects.get(pk=data.get("pk"))
+    assert copy.file_data.path != source.file_data.path
+    with open(copy.file_data.path, "rb") as fh, open("./requirements.txt", "rb") as file:
+        assert fh.read() == file.read()
+    storage = Storage.objects.get(id=user_data.get("storage_id"))
+    assert storage.files_count == 2
+    assert storage.files_size == 2 * source.size
+
+    source.delete()
+    assert client.get(data.get("url_path")).status_code == 200
+
+    response = client.post(f"/api/v1/files/copy/{copy.pk}/")
+    assert response.status_code == 400
+    assert response.json() == {"error": "File with path 'home/' and name 'requirements.txt' already exists."}
+
+    other_file = file_factory(storage=user_factory().storage)
+    response = client.post(f"/api/v1/files/copy/{other_file.pk}/", data={"name": "copy.txt"})
+    assert response.status_code == 403
+
+
+@pytest.mark.django_db
+def test_share_uploaded_file_regular_token(
+    client, monkeypatch, django_assert_num_queries, django_capture_on_commit_callbacks, jwt_token_regular_factory
+):
+    """
+    Download file by signed share link and revoke the link
+    """
+    monkeypatch.setattr(access_log, "_records", [])
+    monkeypatch.setattr(access_log, "_last_flush", time.monotonic())
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    with open("./requirements.txt", "rb") as file:
+        file_data = client.post("/api/v1/files/", data={"file_data": file, "name": "requirements.txt"}).json()
+    response = client.post(f"/api/v1/files/share/{file_data.get('pk')}/", data={"expires_in": 600, "permission": "inline"})
+    assert response.status_code == 201
+    share_data = response.json()
+    client.credentials(HTTP_AUTHORIZATION="")
+
+    response = client.get(share_data.get("url_path"))
+    assert response.status_code == 200
+    assert response["Content-Disposition"] == "inline; filename=requirements.txt"
+    assert "public" in response["Cache-Control"]
+    with open("./requirements.txt", "rb") as file:
+        assert b"".join(response.streaming_content) == file.read()
+    with django_assert_num_queries(0):
+        assert client.get(share_data.get("url_path")).status_code == 200
+    cache.clear()
+    with django_assert_num_queries(1):
+        assert client.get(share_data.get("url_path")).status_code == 200
+    with django_assert_num_queries(0):
+        assert client.get(share_data.get("url_path")).status_code == 200
+
+    assert client.get(share_data.get("url_path")[:-2] + "x/").status_code == 404
+
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    with django_capture_on_commit_callbacks(execute=True):
+        assert client.post(f"/api/v1/files/share/revoke/{file_data.get('pk')}/").status_code == 204
+    with django_assert_num_queries(0):
+        assert client.get(share_data.get("url_path")).status_code == 410
+
+    response = client.post(f"/api/v1/files/share/{file_data.get('pk')}/", data={"expires_in": 600, "permission": "inline"})
+    share_data = response.json()
+    assert client.get(share_data.get("url_path")).status_code == 200
+    with django_capture_on_commit_callbacks(execute=True):
+        assert client.delete(f"/api/v1/files/delete/{file_data.get('pk')}/").status_code == 204
+    with django_assert_num_queries(0):
+        assert client.get(share_data.get("url_path")).status_code == 410
+
+
+@pytest.mark.django_db
+def test_throttle_requests_and_download_bandwidth(client, settings, monkeypatch, jwt_token_regular_factory):
+    """
+    Reject requests over rate limit and slow down downloads over bandwidth limit
+    """
+    monkeypatch.setattr(throttling, "local_backend", throttling.LocalBucketBackend())
+    sleeps = []
+    monkeypatch.setattr(throttling.time, "sleep", sleeps.append)
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    file = SimpleUploadedFile("data.bin", b"0" * 1000000, content_type="application/octet-stream")
+    file_data = client.post("/api/v1/files/", data={"file_data": file, "name": "data.bin"}).json()
+
+    settings.USER_REQUEST_RATE = 1
+    settings.USER_REQUEST_BURST = 2
+    assert client.get(f"/api/v1/storages/{user_data.get('storage_id')}/").status_code == 200
+    assert client.get(f"/api/v1/storages/{user_data.get('storage_id')}/").status_code == 200
+    response = client.get(f"/api/v1/storages/{user_data.get('storage_id')}/")
+    assert response.status_code == 429
+    assert response["Retry-After"] == "1"
+
+    settings.USER_REQUEST_RATE = 0
+    settings.USER_DOWNLOAD_RATE = 500000
+    settings.BANDWIDTH_BURST = 100000
+    response = client.get("/download" + file_data.get("url_path"))
+    assert response.status_code == 200
+    assert len(b"".join(response.streaming_content)) == 1000000
+    assert max(sleeps) == pytest.approx(1.8, abs=0.1)
+
+
+def test_cache_token_bucket(settings):
+    """
+    Take tokens from bucket shared through cache
+    """
+    settings.THROTTLE_BACKEND = "cache"
+    bucket = throttling.TokenBucket("test:cache", rate=10, capacity=5)
+    assert [bucket.consume(1) for _ in range(5)] == [0, 0, 0, 0, 0]
+    assert bucket.consume(1) == pytest.approx(0.1, abs=0.05)
+    assert bucket.consume(10, allow_debt=True) == pytest.approx(1.0, abs=0.05)
+    assert bucket.get_wait() == pytest.approx(1.0, abs=0.05)
+
+
+@pytest.mark.django_db
+def test_create_file_sniffed_content_type(client, settings, jwt_token_regular_factory):
+    """
+    Detect content type of uploaded file from its data and reject denied types
+    """
+    settings.UPLOAD_DENIED_CONTENT_TYPES = ["application/x-msdownload", "video/"]
+    image_data = io.BytesIO()
+    Image.new("RGB", (10, 10), "red").save(image_data, "PNG")
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    file = SimpleUploadedFile("image.txt", image_data.getvalue(), content_type="text/html")
+    response = client.post("/api/v1/files/", data={"file_data": file, "name": "image.txt"})
+    assert response.status_code == 201
+    assert response.json().get("content_type") == "image/png"
+
+    file = SimpleUploadedFile("setup.pdf", b"MZ\x90\x00\x03" + b"\x00" * 100, content_type="application/pdf")
+    response = client.post("/api/v1/files/", data={"file_data": file, "name": "setup.pdf"})
+    assert response.status_code == 400
+    assert response.json() == {"error": "File type 'application/x-msdownload' is not allowed."}
+
+    file1 = SimpleUploadedFile("notes.txt", b"plain text notes", content_type="application/octet-stream")
+    file2 = SimpleUploadedFile("clip.txt", b"\x00\x00\x00\x18ftypmp42" + b"\x00" * 100, content_type="text/plain")
+    response = client.post("/api/v1/files/bulk/", data={"file_data": [file1, file2]})
+    assert response.status_code == 201
+    data = response.json()
+    assert [(result.get("name"), result.get("created")) for result in data] == [("clip.txt", False), ("notes.txt", True)]
+    assert data[1].get("file").get("content_type") == "text/plain"
+    assert File.objects.filter(storage_id=user_data.get("storage_id")).count() == 2
+
+    file1 = SimpleUploadedFile("image.png", image_data.getvalue(), content_type="image/png")
+    file2 = SimpleUploadedFile("page.txt", b"<script>alert(1)</script>", content_type="text/html")
+    file3 = SimpleUploadedFile("data.json", b'{"key": "value"}', content_type="application/json")
+    response = client.post("/api/v1/files/bulk/", data={"file_data": [file1, file2, file3]})
+    assert response.status_code == 201
+    assert {result.get("name"): result.get("file").get("content_type") for result in response.json()} == {
+        "data.json": "application/json",
+        "image.png": "image/png",
+        "page.txt": "text/plain",
+    }
+
+
+def test_sniffing_upload_handler_empty_file(rf):
+    """
+    Empty file following another file in the same request does not inherit its detected content type
+    """
+    image_data = io.BytesIO()
+    Image.new("RGB", (10, 10), "red").save(image_data, "PNG")
+    handler = SniffingMemoryFileUploadHandler(rf.post("/api/v1/files/bulk/"))
+    handler.handle_raw_input(None, {}, 1000, "boundary")
+    with pytest.raises(StopFutureHandlers):
+        handler.new_file("file_data", "image.png", "image/png", len(image_data.getvalue()))
+    handler.receive_data_chunk(image_data.getvalue(), 0)
+    assert handler.file_complete(len(image_data.getvalue())).content_type == "image/png"
+    with pytest.raises(StopFutureHandlers):
+        handler.new_file("file_data", "e.txt", "text/plain", 0)
+    assert handler.file_complete(0).content_type == "text/plain"
+
+
+def test_local_token_bucket_limit(monkeypatch):
+    """
+    Drop least recently used buckets when number of buckets exceeds the limit
+    """
+    backend = throttling.LocalBucketBackend()
+    monkeypatch.setattr(backend, "max_buckets", 2)
+    backend.advance("first", 10, 100, 60)
+    backend.advance("second", 10, 100, 60)
+    backend.advance("first", 10, 100, 60)
+    backend.advance("third", 10, 100, 60)
+    assert backend.get("first") == 120
+    assert backend.get("second") is None
+    assert backend.get("third") == 110
+
+
+@pytest.mark.django_db
+def test_create_files_rejected_under_lock(client, monkeypatch, jwt_token_regular_factory, clean_media):
+    """
+    Stored contents of files rejected by the checks repeated under the storage lock are deleted
+    """
+    max_sizes = iter([10**9, 10, 10**9, 10])
+    monkeypatch.setattr(serializers, "get_max_size", lambda storage: next(max_sizes))
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    media = os.path.join(django_settings.MEDIA_ROOT, "test")
+    stored = {os.path.join(root, name) for root, _, names in os.walk(media) for name in names}
+
+    with open("./requirements.txt", "rb") as file:
+        response = client.post("/api/v1/files/", data={"file_data": file, "name": "requirements.txt"})
+    assert response.status_code == 400
+    assert response.json() == {"error": get_quota_error(10)}
+
+    file1 = SimpleUploadedFile("first.txt", b"first file content")
+    file2 = SimpleUploadedFile("second.txt", b"second file content")
+    response = client.post("/api/v1/files/bulk/", data={"file_data": [file1, file2]})
+    assert response.status_code == 400
+    assert [(result.get("created"), result.get("error")) for result in response.json()] == [(False, get_quota_error(10))] * 2
+    assert {os.path.join(root, name) for root, _, names in os.walk(media) for name in names} == stored
+    assert not File.objects.filter(storage_id=user_data.get("storage_id")).exists()
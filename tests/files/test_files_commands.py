@@ -0,0 +1,72 @@
+import io
+import os
+import time
+
+import pytest
+from django.core.management import call_command
+
+from files.management.commands.collect_orphans import Command as CollectOrphansCommand
+from files.models import File
+
+pytestmark = pytest.mark.usefixtures("clean_media")
+
+
+@pytest.mark.django_db
+def test_collect_orphans(client, jwt_token_regular_factory):
+    """
+    Delete files that are not referenced by File and are older than grace period
+    """
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    with open("./requirements.txt", "rb") as file:
+        data = {"file_data": file, "name": "requirements.txt", "path": "home/"}
+        assert client.post("/api/v1/files/", data=data).status_code == 201
+    file_obj = File.objects.get()
+    old_time = time.time() - 7200
+    os.utime(file_obj.file_data.path, (old_time, old_time))
+    os.makedirs("./media/test/old/", exist_ok=True)
+    for path in ("./media/test/old/orphan.txt", "./media/test/home/fresh.txt"):
+        with open(path, "wb") as fh:
+            fh.write(b"orphan")
+    os.utime("./media/test/old/orphan.txt", (old_time, old_time))
+
+    out = io.StringIO()
+    call_command("collect_orphans", "--dry-run", stdout=out)
+    assert "Orphaned file: test/old/orphan.txt" in out.getvalue()
+    assert "1 orphaned files of 6 bytes found" in out.getvalue()
+    assert os.path.exists("./media/test/old/orphan.txt")
+
+    out = io.StringIO()
+    call_command("collect_orphans", "--delete-rate", "100", stdout=out)
+    assert "1 orphaned files of 6 bytes deleted" in out.getvalue()
+    assert not os.path.exists("./media/test/old/")
+    assert os.path.exists("./media/test/home/fresh.txt")
+    assert os.path.exists(file_obj.file_data.path)
+
+
+@pytest.mark.django_db
+def test_collect_orphans_copy_during_sweep(client, monkeypatch, jwt_token_regular_factory):
+    """
+    Keep file copied from an old file after mark phase, copy shares content and time of the source
+    """
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    with open("./requirements.txt", "rb") as file:
+        data = {"file_data": file, "name": "requirements.txt", "path": "home/"}
+        source = File.objects.get(pk=client.post("/api/v1/files/", data=data).json().get("pk"))
+    old_time = time.time() - 7200
+    os.utime(source.file_data.path, (old_time, old_time))
+    copies = []
+    mark = CollectOrphansCommand.mark
+
+    def mark_and_copy(command, batch_size):
+        marked = mark(command, batch_size)
+        response = client.post(f"/api/v1/files/copy/{source.pk}/", data={"path": "work/"})
+        copies.append(File.objects.get(pk=response.json().get("pk")))
+        return marked
+
+    monkeypatch.setattr(CollectOrphansCommand, "mark", mark_and_copy)
+    out = io.StringIO()
+    call_command("collect_orphans", stdout=out)
+    assert "0 orphaned files of 0 bytes deleted" in out.getvalue()
+    assert os.path.exists(copies[0].file_data.path)
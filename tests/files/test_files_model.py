@@ -1,6 +1,7 @@
 import pytest
 
 from files.models import File
+from storage.models import Storage
 
 
 @pytest.mark.django_db
@@ -12,6 +13,7 @@ def test_create_file(user_factory, file_factory):
     file = file_factory(storage=user.storage, size=100)
 
     assert File.objects.filter(id=file.pk).exists()
+    user.storage.refresh_from_db()
     assert user.storage.files_count == 1
     assert user.storage.files_size == file.size
 
@@ -25,10 +27,28 @@ def test_create_files(user_factory, file_factory):
     file = file_factory(_quantity=3, storage=user.storage, size=100)
 
     assert File.objects.count() == 3
+    user.storage.refresh_from_db()
     assert user.storage.files_count == 3
     assert user.storage.files_size == file[1].size * 3
 
 
+@pytest.mark.django_db
+def test_create_delete_files_stale_storage(user_factory, file_factory):
+    """
+    Files created and deleted through stale storage instances do not overwrite each other's counters
+    """
+    user = user_factory()
+    storages = [Storage.objects.get(pk=user.storage.pk) for _ in range(3)]
+    files = [file_factory(storage=storage, size=100) for storage in storages]
+    storages[0].refresh_from_db()
+    assert (storages[0].files_count, storages[0].files_size) == (3, 300)
+
+    File.objects.get(pk=files[0].pk).delete()
+    files[1].delete()
+    storages[0].refresh_from_db()
+    assert (storages[0].files_count, storages[0].files_size) == (1, 100)
+
+
 @pytest.mark.django_db
 def test_update_file(user_factory, file_factory):
     """
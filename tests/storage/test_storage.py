@@ -1,4 +1,23 @@
+import io
+import shutil
+import threading
+import zipfile
+
 import pytest
+from django.db import DatabaseError
+
+from files.analytics import access_log
+from files.models import File, Folder
+
+
+def teardown_function():
+    """
+    Delete created files during testing
+    """
+    try:
+        shutil.rmtree("./media/test/")
+    except FileNotFoundError:
+        pass
 
 
 @pytest.mark.django_db
@@ -105,3 +124,220 @@ def test_storage_other_user_retrieve_view_admin(client, user_factory, jwt_token_
     assert data.get("files_count") == 0
     assert data.get("files_size") == 0
     assert data.get("owner").get("username") == user_data2.username
+
+
+@pytest.mark.django_db
+def test_storage_archive_view_regular(client, jwt_token_regular_factory):
+    """
+    Download folder of own storage as zip archive with regular token
+    """
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    for name, path in (("requirements.txt", "home/"), ("nested.txt", "home/nested/"), ("other.txt", "other/")):
+        with open("./requirements.txt", "rb") as file:
+            response = client.post("/api/v1/files/", data={"file_data": file, "name": name, "path": path})
+            assert response.status_code == 201
+    response = client.get(f"/api/v1/storages/{user_data.get('storage_id')}/archive/?path=home/")
+    assert response.status_code == 200
+    assert response["Content-Disposition"] == "attachment; filename=home.zip"
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+    assert sorted(archive.namelist()) == ["nested/nested.txt", "requirements.txt"]
+    with open("./requirements.txt", "rb") as file:
+        assert archive.read("requirements.txt") == file.read()
+
+
+@pytest.mark.django_db
+def test_storage_archive_view_other_user_regular(client, user_factory, jwt_token_regular_factory):
+    """
+    Download archive of other user storage with regular token
+    """
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    user = user_factory()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    response = client.get(f"/api/v1/storages/{user.storage.pk}/archive/")
+    assert response.status_code == 403
+
+
+@pytest.mark.django_db
+def test_storage_folder_view_regular(client, file_factory, jwt_token_regular_factory):
+    """
+    List subfolders with their files count and size and paginated files of folder with regular token
+    """
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    storage_id = user_data.get("storage_id")
+    for name, path, size in [
+        ("a.txt", "home/", 1),
+        ("b.txt", "home/", 2),
+        ("c.txt", "home/docs/", 10),
+        ("d.txt", "home/docs/old/", 20),
+        ("e.txt", "home/photos/", 100),
+        ("f.txt", "work/", 1000),
+    ]:
+        file_factory(storage_id=storage_id, name=name, path=path, size=size)
+
+    response = client.get(f"/api/v1/storages/{storage_id}/folders/", {"path": "home/"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data.get("path") == "home/"
+    assert data.get("count") == 4
+    assert [file.get("name") for file in data.get("results")] == ["a.txt", "b.txt"]
+    assert data.get("folders") == [
+        {"name": "docs", "path": "home/docs/", "files_count": 2, "files_size": 30},
+        {"name": "photos", "path": "home/photos/", "files_count": 1, "files_size": 100},
+    ]
+
+    pages = [
+        client.get(f"/api/v1/storages/{storage_id}/folders/", {"path": "home/", "page_size": 3, "page": page}).json() for page in (1, 2)
+    ]
+    assert [folder.get("name") for folder in pages[0].get("folders")] == ["docs", "photos"]
+    assert [file.get("name") for file in pages[0].get("results")] == ["a.txt"]
+    assert pages[0].get("next") is not None
+    assert pages[1].get("folders") == []
+    assert [file.get("name") for file in pages[1].get("results")] == ["b.txt"]
+
+    data = client.get(f"/api/v1/storages/{storage_id}/folders/").json()
+    assert data.get("count") == 2
+    assert [(folder.get("path"), folder.get("files_count")) for folder in data.get("folders")] == [("home/", 5), ("work/", 1)]
+    assert client.get(f"/api/v1/storages/{storage_id}/folders/", {"path": "../"}).status_code == 400
+
+    File.objects.get(name="d.txt").delete()
+    File.objects.get(name="e.txt").delete()
+    data = client.get(f"/api/v1/storages/{storage_id}/folders/", {"path": "home/"}).json()
+    assert data.get("folders") == [{"name": "docs", "path": "home/docs/", "files_count": 1, "files_size": 10}]
+    assert not Folder.objects.filter(path__in=["home/docs/old/", "home/photos/"]).exists()
+
+
+@pytest.mark.django_db
+def test_storage_folder_view_other_user_regular(client, user_factory, jwt_token_regular_factory):
+    """
+    List folder of other user storage with regular token
+    """
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    user = user_factory()
+    response = client.get(f"/api/v1/storages/{user.storage.pk}/folders/")
+    assert response.status_code == 403
+
+
+@pytest.mark.django_db
+def test_storage_analytics_view_admin(client, monkeypatch, jwt_token_admin_factory):
+    """
+    Get daily download rollups with admin token
+    """
+    monkeypatch.setattr(access_log, "_records", [])
+    user_data = jwt_token_admin_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    with open("./requirements.txt", "rb") as file:
+        response = client.post("/api/v1/files/", data={"file_data": file, "name": "requirements.txt"})
+        assert response.status_code == 201
+    file_data = response.json()
+    for _ in range(3):
+        assert client.get("/download" + file_data.get("url_path")).status_code == 200
+    access_log.flush()
+
+    response = client.get("/api/v1/storages/analytics/")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 1
+    assert data[0].get("username") == user_data.get("username")
+    assert data[0].get("downloads") == 3
+    assert data[0].get("bytes_served") == 3 * int(file_data.get("size"))
+
+    response = client.get(f"/api/v1/storages/{user_data.get('storage_id')}/analytics/?date_from=2000-01-01")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 1
+    assert data[0].get("name") == "requirements.txt"
+    assert data[0].get("downloads") == 3
+
+    response = client.get(f"/api/v1/storages/{user_data.get('storage_id')}/analytics/?date_to=tomorrow")
+    assert response.status_code == 400
+
+
+def test_access_log_background_flush(monkeypatch, settings):
+    """
+    Flush access log in background thread, keep records if database is not available
+    """
+    monkeypatch.setattr(access_log, "_records", [])
+    flushed = threading.Event()
+
+    def failing_save(records):
+        flushed.set()
+        raise DatabaseError("database is not available")
+
+    monkeypatch.setattr(access_log, "save", failing_save)
+    settings.ACCESS_LOG_BUFFER_SIZE = 2
+    file_obj = File(pk=1, storage_id=1)
+    access_log.record(file_obj, 100)
+    assert not flushed.is_set()
+    access_log.record(file_obj, 100, downloaded=True)
+    assert flushed.wait(5)
+    for thread in threading.enumerate():
+        if thread.name == "access-log-flush":
+            thread.join()
+    assert len(access_log._records) == 2  # pylint: disable=protected-access
+    assert access_log._flushing is False  # pylint: disable=protected-access
+
+
+@pytest.mark.django_db
+def test_storage_changes_view_regular(client, jwt_token_regular_factory):
+    """
+    Fetch changes of own storage since cursor with regular token
+    """
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    url = f"/api/v1/storages/{user_data.get('storage_id')}/changes/"
+    cursor = client.get(f"/api/v1/storages/{user_data.get('storage_id')}/").json().get("cursor")
+    with open("./requirements.txt", "rb") as file:
+        file_data = client.post("/api/v1/files/", data={"file_data": file, "name": "requirements.txt"}).json()
+    assert client.get("/download" + file_data.get("url_path")).status_code == 200
+    assert client.patch(f"/api/v1/files/update/{file_data.get('pk')}/", data={"note": "test_note"}).status_code == 200
+    assert client.delete(f"/api/v1/files/delete/{file_data.get('pk')}/").status_code == 204
+
+    response = client.get(url, {"cursor": cursor, "limit": 2})
+    assert response.status_code == 200
+    data = response.json()
+    assert [change.get("action") for change in data.get("changes")] == ["created", "updated"]
+    assert data.get("changes")[0].get("url_path") == file_data.get("url_path")
+    assert data.get("has_more") is True
+
+    data = client.get(url, {"cursor": data.get("cursor")}).json()
+    assert [change.get("action") for change in data.get("changes")] == ["deleted"]
+    assert data.get("changes")[0].get("file_id") == file_data.get("pk")
+    assert data.get("has_more") is False
+
+    data = client.get(url, {"cursor": data.get("cursor")}).json()
+    assert data.get("changes") == []
+    assert client.get(url, {"cursor": "latest"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_storage_quota_plan_admin(client, user_factory, jwt_token_admin_factory):
+    """
+    Limit storage by plan and by own quota with admin token
+    """
+    user_data = jwt_token_admin_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    storage_id = user_factory().storage.pk
+    response = client.post("/api/v1/plans/", data={"name": "large", "max_size": 5000000000000})
+    assert response.status_code == 201
+    plan = response.json()
+
+    response = client.patch(f"/api/v1/storages/{storage_id}/quota/", data={"plan": plan.get("pk")})
+    assert response.status_code == 200
+    assert response.json().get("effective_max_size") == 5000000000000
+    assert client.get(f"/api/v1/storages/{storage_id}/").json().get("max_size") == 5000000000000
+
+    assert client.patch(f"/api/v1/plans/{plan.get('pk')}/", data={"max_size": 6000000000000}).status_code == 200
+    assert client.get(f"/api/v1/storages/{storage_id}/").json().get("max_size") == 6000000000000
+
+    response = client.patch(f"/api/v1/storages/{user_data.get('storage_id')}/quota/", data={"max_size": 10})
+    assert response.json().get("effective_max_size") == 10
+    with open("./requirements.txt", "rb") as file:
+        response = client.post("/api/v1/files/", data={"file_data": file, "name": "requirements.txt"})
+    assert response.status_code == 400
+    assert response.json() == {"error": "User's storage is limited with max files_size value of 10 B"}
+
+    client.credentials(HTTP_AUTHORIZATION="")
+    assert client.get("/api/v1/plans/").status_code == 401
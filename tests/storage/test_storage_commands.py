@@ -0,0 +1,82 @@
+import io
+import os
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from files.folders import rebuild_folders
+from files.models import File, Folder
+from storage.models import Storage
+
+pytestmark = pytest.mark.usefixtures("clean_media")
+
+
+@pytest.mark.django_db
+def test_reconcile_storage_counters(user_factory, file_factory):
+    """
+    Reconcile storage counters that drifted from stored files
+    """
+    user = user_factory()
+    file_factory(_quantity=2, storage=user.storage, size=100, path="home/docs/")
+    Storage.objects.filter(pk=user.storage.pk).update(files_count=5, files_size=10)
+    Folder.objects.filter(storage=user.storage).update(files_count=7)
+    out = io.StringIO()
+    call_command("reconcile_storage", "--skip-disk", stdout=out)
+    assert f"Storage {user.storage.pk}: files_count 5 -> 2, files_size 10 -> 200" in out.getvalue()
+    assert Storage.objects.get(pk=user.storage.pk).files_count == 5
+
+    call_command("reconcile_storage", "--skip-disk", "--fix", stdout=io.StringIO())
+    storage = Storage.objects.get(pk=user.storage.pk)
+    assert storage.files_count == 2
+    assert storage.files_size == 200
+    assert list(Folder.objects.filter(storage=storage).values_list("path", "parent", "files_count", "files_size")) == [
+        ("home/", "", 2, 200),
+        ("home/docs/", "home/", 2, 200),
+    ]
+
+
+@pytest.mark.django_db
+def test_rebuild_folders_locked_snapshot(user_factory, file_factory):
+    """
+    Files of the storages are read in the folder rebuild transaction after their storage rows are locked
+    """
+    user = user_factory()
+    file_factory(storage=user.storage, size=100, path="home/")
+    with CaptureQueriesContext(connection) as queries:
+        rebuild_folders([user.storage])
+    sql = [query["sql"] for query in queries.captured_queries]
+    files_query = next(i for i, query in enumerate(sql) if query.startswith("SELECT") and '"files_file"' in query)
+    storage_query = next(i for i, query in enumerate(sql) if query.startswith("SELECT") and '"storage_storage"' in query)
+    assert sql[0].startswith("SAVEPOINT") and storage_query < files_query
+    assert Folder.objects.get(storage=user.storage, path="home/").files_size == 100
+
+
+@pytest.mark.django_db
+def test_reconcile_storage_disk(tmp_path, client, jwt_token_regular_factory):
+    """
+    Find missing and orphaned files in MEDIA_ROOT and resume from checkpoint
+    """
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    for name in ("first.txt", "second.txt"):
+        with open("./requirements.txt", "rb") as file:
+            assert client.post("/api/v1/files/", data={"file_data": file, "name": name}).status_code == 201
+    missing = File.objects.get(name="first.txt")
+    os.remove(missing.file_data.path)
+    with open(os.path.join(os.path.dirname(missing.file_data.path), "orphan.txt"), "wb") as fh:
+        fh.write(b"orphan")
+
+    out = io.StringIO()
+    call_command("reconcile_storage", "-v", "2", stdout=out)
+    assert f"Missing file: {missing.file_data.name}" in out.getvalue()
+    assert "Orphaned file: test/orphan.txt" in out.getvalue()
+    assert "1 missing files, 1 orphaned files, 0 size mismatches" in out.getvalue()
+
+    checkpoint = tmp_path / "checkpoint.json"
+    checkpoint.write_text(f'{{"last_pk": {user_data.get("storage_id")}}}')
+    out = io.StringIO()
+    call_command("reconcile_storage", "--checkpoint", str(checkpoint), stdout=out)
+    assert "Checked 0 storages" in out.getvalue()
+    assert not checkpoint.exists()
@@ -3,6 +3,7 @@ from django.db import IntegrityError
 
 from files.models import File
 from storage.models import Storage
+from storage.quotas import get_quota_error
 from user.models import User
 
 
@@ -39,3 +40,13 @@ def test_storage_deletes_with_user(user_factory, file_factory):
     assert Storage.objects.all().exists()
     User.objects.first().delete()
     assert not Storage.objects.all().exists()
+
+
+def test_quota_error_units():
+    """
+    Quota error shows storage limit in readable units
+    """
+    assert get_quota_error(500000000).endswith("max files_size value of 500 MB")
+    assert get_quota_error(1500000000).endswith("max files_size value of 1.5 GB")
+    assert get_quota_error(2000000000).endswith("max files_size value of 2 GB")
+    assert get_quota_error(6000000000000).endswith("max files_size value of 6 TB")
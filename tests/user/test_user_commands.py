@@ -0,0 +1,65 @@
+import datetime
+import io
+import os
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from files.models import File, Folder
+from user.models import User
+
+pytestmark = pytest.mark.usefixtures("clean_media")
+
+
+@pytest.mark.django_db
+def test_purge_users(client, user_factory, file_factory, jwt_token_regular_factory):
+    """
+    Purge files of user deactivated longer than retention period ago
+    """
+    user_data = jwt_token_regular_factory("test", "test@test.ru", "test_name")
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {user_data.get('token')}")
+    for name in ("first.txt", "second.txt", "third.txt"):
+        with open("./requirements.txt", "rb") as file:
+            assert client.post("/api/v1/files/", data={"file_data": file, "name": name, "path": "home/"}).status_code == 201
+    paths = [file_obj.file_data.path for file_obj in File.objects.all()]
+    active_user = user_factory()
+    file_factory(storage=active_user.storage, size=100, path="home/")
+
+    assert client.delete(f"/api/v1/users/delete/{user_data.get('id')}/").status_code == 204
+    call_command("purge_users", stdout=io.StringIO())
+    assert File.objects.filter(storage_id=user_data.get("storage_id")).count() == 3
+
+    User.objects.filter(pk=user_data.get("id")).update(deactivated_at=timezone.now() - datetime.timedelta(days=31))
+    out = io.StringIO()
+    call_command("purge_users", "--batch-size", "2", stdout=out)
+    assert "Purged 3 files of 1 users" in out.getvalue()
+    assert not File.objects.filter(storage_id=user_data.get("storage_id")).exists()
+    assert File.objects.filter(storage=active_user.storage).exists()
+    user = User.objects.get(pk=user_data.get("id"))
+    assert user.storage.files_count == 0
+    assert user.storage.files_size == 0
+    assert not Folder.objects.filter(storage=user.storage).exists()
+    assert Folder.objects.get(storage=active_user.storage).files_count == 1
+    assert not any(os.path.exists(path) for path in paths)
+
+
+@pytest.mark.django_db
+def test_purge_users_legacy_deactivated(user_factory, file_factory):
+    """
+    Purge files of user deactivated before deactivation time was recorded after retention period since the first run
+    """
+    user = user_factory(is_active=False, deactivated_at=None)
+    file_factory(storage=user.storage, size=100)
+    out = io.StringIO()
+    call_command("purge_users", stdout=out)
+    assert "Marked 1 users deactivated before deactivation time was recorded" in out.getvalue()
+    assert "Purged 0 files of 0 users" in out.getvalue()
+    user.refresh_from_db()
+    assert user.deactivated_at is not None
+
+    User.objects.filter(pk=user.pk).update(deactivated_at=timezone.now() - datetime.timedelta(days=31))
+    out = io.StringIO()
+    call_command("purge_users", stdout=out)
+    assert "Purged 1 files of 1 users" in out.getvalue()
+    assert not File.objects.filter(storage=user.storage).exists()
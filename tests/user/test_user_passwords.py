@@ -0,0 +1,99 @@
+import runpy
+import threading
+import time
+
+import pytest
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.core.exceptions import ImproperlyConfigured
+
+from NetoCloud import settings as settings_module
+from user.hashing import HashingPool, PasswordHashingBusy, hashing_pool
+from user.models import User
+from user.validators import CommonPasswordValidator
+
+
+def test_common_password_validator_shared_list():
+    """
+    Common passwords list is loaded once into a frozenset shared by validators
+    """
+    validator = CommonPasswordValidator()
+    assert isinstance(validator.passwords, frozenset)
+    assert CommonPasswordValidator().passwords is validator.passwords
+    assert "password" in validator.passwords
+
+
+def test_scrypt_hasher_settings(settings):
+    """
+    Passwords are hashed by the configured hasher with parameters from settings,
+    hashes of previous hasher are still accepted
+    """
+    old_hash = make_password("testpassword!")
+    settings.PASSWORD_HASHERS = ["user.hashers.ScryptPasswordHasher", "django.contrib.auth.hashers.PBKDF2PasswordHasher"]
+    settings.SCRYPT_WORK_FACTOR = 2**10
+    settings.SCRYPT_PARALLELISM = 1
+    encoded = make_password("testpassword!")
+    assert encoded.startswith("scrypt$1024$")
+    assert check_password("testpassword!", encoded)
+    assert check_password("testpassword!", old_hash)
+    assert identify_hasher(old_hash).must_update(old_hash) is False
+
+
+@pytest.mark.django_db
+def test_create_user_hashing_pool(client, registration_data_factory):
+    """
+    Password of registered user is hashed in the hashing pool
+    """
+    data = registration_data_factory("test", "test@test.ru", "test_name")
+    response = client.post("/api/v1/users/", data=data, format="json")
+    assert response.status_code == 201
+    user = User.objects.get(username=data["username"])
+    assert user.check_password(data["password"])
+    executor, _ = hashing_pool.get_executor()
+    assert executor._threads  # pylint: disable=protected-access
+
+
+@pytest.mark.django_db
+def test_create_user_hashing_busy(client, monkeypatch, registration_data_factory):
+    """
+    Registration is rejected with 503 while hashing pool is full
+    """
+    data = registration_data_factory("test", "test@test.ru", "test_name")
+    executor, _ = hashing_pool.get_executor()
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()  # pylint: disable=consider-using-with
+    monkeypatch.setattr(hashing_pool, "get_executor", lambda: (executor, slots))
+    response = client.post("/api/v1/users/", data=data, format="json")
+    assert response.status_code == 503
+    assert not User.objects.filter(username=data["username"]).exists()
+
+
+def test_hashing_pool_busy_shipped_config(settings, monkeypatch):
+    """
+    With shipped defaults request threads of one worker can fill the hashing pool and the last one gets 503,
+    configurations giving a slot to every request thread are refused
+    """
+    for name in ("GUNICORN_THREADS", "PASSWORD_HASHING_THREADS", "PASSWORD_HASHING_QUEUE"):
+        monkeypatch.delenv(name, raising=False)
+    shipped = runpy.run_path(settings_module.__file__)
+    settings.PASSWORD_HASHING_THREADS = shipped["PASSWORD_HASHING_THREADS"]
+    settings.PASSWORD_HASHING_QUEUE = shipped["PASSWORD_HASHING_QUEUE"]
+    pool = HashingPool()
+    release = threading.Event()
+    requests = [threading.Thread(target=pool.run, args=(release.wait, 10)) for _ in range(shipped["GUNICORN_THREADS"] - 1)]
+    for request in requests:
+        request.start()
+    _, slots = pool.get_executor()
+    deadline = time.monotonic() + 5
+    while slots._value and time.monotonic() < deadline:  # pylint: disable=protected-access
+        time.sleep(0.01)
+    try:
+        with pytest.raises(PasswordHashingBusy):
+            pool.run(release.wait, 10)
+    finally:
+        release.set()
+        for request in requests:
+            request.join()
+
+    monkeypatch.setenv("PASSWORD_HASHING_QUEUE", str(shipped["GUNICORN_THREADS"] - shipped["PASSWORD_HASHING_THREADS"]))
+    with pytest.raises(ImproperlyConfigured):
+        runpy.run_path(settings_module.__file__)
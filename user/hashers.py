@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+    Argon2 with parameters from settings. Single lane keeps one hash on one core,
+    so concurrent registrations do not compete for all cores of the server.
+    """
+
+    @property
+    def time_cost(self):
+        """
+        Number of passes over memory
+        """
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        """
+        Memory used by one hash in KiB
+        """
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        """
+        Number of lanes (threads) of one hash
+        """
+        return settings.ARGON2_PARALLELISM
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    """
+    Scrypt with parameters from settings and memory limit matching them
+    """
+
+    @property
+    def work_factor(self):
+        """
+        CPU and memory cost, power of two
+        """
+        return settings.SCRYPT_WORK_FACTOR
+
+    @property
+    def block_size(self):
+        """
+        Block size of the mixing function
+        """
+        return settings.SCRYPT_BLOCK_SIZE
+
+    @property
+    def parallelism(self):
+        """
+        Number of lanes (threads) of one hash
+        """
+        return settings.SCRYPT_PARALLELISM
+
+    @property
+    def maxmem(self):
+        """
+        Memory limit of hashlib.scrypt, twice the memory one hash needs
+        """
+        return 2 * 128 * self.work_factor * self.block_size
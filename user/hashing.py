@@ -0,0 +1,83 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many password operations at the moment, try again later."
+    default_code = "password_hashing_busy"
+
+
+class HashingPool:
+    """
+    Runs password hashing in a bounded pool of threads: at most PASSWORD_HASHING_THREADS hashes
+    are computed at once by the worker process and at most PASSWORD_HASHING_QUEUE more wait,
+    other requests are rejected, so registration bursts cannot take all cores and memory.
+    Hash functions release the GIL, threaded workers keep serving other requests meanwhile.
+
+    The bound is shared by request threads of one worker process, gunicorn.conf.py runs gthread workers
+    with GUNICORN_THREADS threads each. Settings keep the bound below GUNICORN_THREADS, otherwise every
+    request thread would get a slot and no request would be rejected. A sync worker serves one request
+    at a time and would never queue.
+    The machine computes at most workers * PASSWORD_HASHING_THREADS hashes at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self):
+        """
+        Drops threads of the parent process, they are not copied by fork
+        """
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    def get_executor(self):
+        """
+        Returns executor and semaphore limiting running and waiting tasks, created on first use
+        """
+        with self._lock:
+            if self._executor is None:
+                threads = settings.PASSWORD_HASHING_THREADS
+                self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="password-hashing")
+                self._slots = threading.BoundedSemaphore(threads + settings.PASSWORD_HASHING_QUEUE)
+            return self._executor, self._slots
+
+    def run(self, func, *args):
+        """
+        Runs func in the pool and returns its result, raises PasswordHashingBusy if the pool is full
+        """
+        executor, slots = self.get_executor()
+        if not slots.acquire(blocking=False):  # pylint: disable=consider-using-with
+            raise PasswordHashingBusy()
+        try:
+            return executor.submit(func, *args).result()
+        finally:
+            slots.release()
+
+
+hashing_pool = HashingPool()
+
+
+def hash_password(password):
+    """
+    Hashes password by the preferred hasher in the hashing pool
+    """
+    return hashing_pool.run(make_password, password)
+
+
+def verify_password(password, encoded):
+    """
+    Checks password against its hash in the hashing pool
+    """
+    return hashing_pool.run(check_password, password, encoded)
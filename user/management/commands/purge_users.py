@@ -0,0 +1,126 @@
+import datetime
+import os
+import queue
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from files.models import File, FileAccessDaily, FileChange, clear_empty_folders, record_changes, update_folders
+from files.sharing import forget_share_links
+from files.thumbnails import delete_thumbnails
+from storage.models import Storage
+from user.models import User
+
+
+class Unlinker:
+    """
+    Background threads removing purged files from disk
+    """
+
+    def __init__(self, workers):
+        self.queue = queue.Queue(maxsize=workers * 1000)
+        self.threads = [threading.Thread(target=self.run, daemon=True) for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def run(self):
+        """
+        Removes queued files and their derivatives until stopped
+        """
+        while True:
+            file_obj = self.queue.get()
+            if file_obj is None:
+                break
+            try:
+                os.remove(file_obj.file_data.path)
+                clear_empty_folders(os.path.dirname(file_obj.file_data.path))
+            except (FileNotFoundError, ValueError):
+                pass
+            delete_thumbnails(file_obj)
+
+    def submit(self, file_obj):
+        """
+        Queues file for removal, blocks if queue is full
+        """
+        self.queue.put(file_obj)
+
+    def stop(self):
+        """
+        Waits until all queued files are removed
+        """
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+
+
+def delete_rows(model, pks):
+    """
+    Deletes rows of the model by primary keys with one query. Unlike QuerySet.delete() it neither
+    loads rows nor sends delete signals, the command updates storages and removes files itself.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    placeholders = ", ".join(["%s"] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders})", pks)
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes files of users deactivated longer than retention period ago, "
+        "users deactivated before deactivation time was recorded are treated as deactivated at the first run"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retention-days", type=int, default=settings.USER_PURGE_RETENTION_DAYS)
+        parser.add_argument("--batch-size", type=int, default=1000, help="files deleted per transaction")
+        parser.add_argument("--workers", type=int, default=4, help="threads removing files from disk")
+
+    def handle(self, *args, **options):
+        legacy = User.objects.filter(is_active=False, deactivated_at__isnull=True).update(deactivated_at=timezone.now())
+        if legacy:
+            self.stdout.write(f"Marked {legacy} users deactivated before deactivation time was recorded as deactivated now")
+        cutoff = timezone.now() - datetime.timedelta(days=options["retention_days"])
+        storages = Storage.objects.select_related("owner").filter(owner__is_active=False, owner__deactivated_at__lte=cutoff)
+        unlinker = Unlinker(options["workers"])
+        purged_storages = purged_files = 0
+        try:
+            for storage in storages.iterator():
+                count = self.purge_storage(storage, options["batch_size"], unlinker)
+                if count:
+                    purged_storages += 1
+                    purged_files += count
+                    self.stdout.write(f"Purged {count} files of user {storage.owner.username}")
+        finally:
+            unlinker.stop()
+        self.stdout.write(f"Purged {purged_files} files of {purged_storages} users")
+
+    def purge_storage(self, storage, batch_size, unlinker):
+        """
+        Deletes files of the storage by short transactions, returns number of deleted files
+        """
+        purged = 0
+        while True:
+            with transaction.atomic():
+                files = list(File.objects.filter(storage=storage).only("pk", "file_data", "name", "path", "url", "size")[:batch_size])
+                if not files:
+                    return purged
+                pks = [file_obj.pk for file_obj in files]
+                FileAccessDaily.objects.filter(file_id__in=pks).delete()
+                delete_rows(File, pks)
+                Storage.objects.filter(pk=storage.pk).update(
+                    files_count=Greatest(F("files_count") - len(files), Value(0)),
+                    files_size=Greatest(F("files_size") - sum(file_obj.size for file_obj in files), Value(0)),
+                )
+                update_folders(storage.pk, files, sign=-1)
+                forget_share_links(files)
+                record_changes(storage.pk, FileChange.DELETED, files)
+            for file_obj in files:
+                unlinker.submit(file_obj)
+            purged += len(files)
@@ -12,6 +12,7 @@ class User(AbstractUser):
             "unique": "A user with that email already exists.",
         },
     )
+    deactivated_at = models.DateTimeField(blank=True, null=True)
     USERNAME_FIELD = "username"
     REQUIRED_FIELDS = ["email", "full_name"]
 
@@ -1,10 +1,10 @@
 from django.urls import path
 
-from .views import UserDeleteView, UserDetailedView, UserListCreateView, UserUpdateView
+from NetoCloud.lazy import lazy_view
 
 urlpatterns = [
-    path("users/", UserListCreateView.as_view()),
-    path("users/<int:pk>/", UserDetailedView.as_view()),
-    path("users/update/<int:pk>/", UserUpdateView.as_view()),
-    path("users/delete/<int:pk>/", UserDeleteView.as_view()),
+    path("users/", lazy_view("user.views.UserListCreateView")),
+    path("users/<int:pk>/", lazy_view("user.views.UserDetailedView")),
+    path("users/update/<int:pk>/", lazy_view("user.views.UserUpdateView")),
+    path("users/delete/<int:pk>/", lazy_view("user.views.UserDeleteView")),
 ]
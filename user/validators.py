@@ -0,0 +1,27 @@
+import functools
+import gzip
+
+from django.contrib.auth import password_validation
+
+
+@functools.lru_cache
+def load_common_passwords(path):
+    """
+    Reads lowercased common passwords list, which may be gzipped, once per process
+    """
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            return frozenset(line.strip() for line in fh)
+    except OSError:
+        with open(path, encoding="utf-8") as fh:
+            return frozenset(line.strip() for line in fh)
+
+
+class CommonPasswordValidator(password_validation.CommonPasswordValidator):
+    """
+    Common password validator sharing one frozenset of the list between all its instances,
+    so building validators again does not read and decompress 20000 passwords
+    """
+
+    def __init__(self, password_list_path=None):  # pylint: disable=super-init-not-called
+        self.passwords = load_common_passwords(str(password_list_path or self.DEFAULT_PASSWORD_LIST_PATH))
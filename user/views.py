@@ -1,16 +1,18 @@
-from django.contrib.auth.hashers import check_password, make_password
 from django.db.models import Q
+from django.utils import timezone
 from rest_framework import generics, status
 from rest_framework.response import Response
 
+from api.mixins import ReplicaReadMixin
 from user.permissions import isStaffEditorPermission, isStaffOrUserPermission
 
+from .hashing import hash_password, verify_password
 from .mixins import PasswordValidatorMixin
 from .models import User
 from .serializers import UserSerializer, UserSerializerAdmin
 
 
-class UserListCreateView(generics.ListAPIView, generics.CreateAPIView, PasswordValidatorMixin):
+class UserListCreateView(ReplicaReadMixin, generics.ListAPIView, generics.CreateAPIView, PasswordValidatorMixin):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [isStaffEditorPermission]
@@ -35,10 +37,9 @@ class UserListCreateView(generics.ListAPIView, generics.CreateAPIView, PasswordV
         response = self.password_validator(request)
         if response:
             return response
-        password = make_password(request.data.get("password"))
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer, password=password)
+        self.perform_create(serializer, password=hash_password(request.data.get("password")))
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
@@ -71,7 +72,7 @@ class UserUpdateView(generics.UpdateAPIView, PasswordValidatorMixin):
         serializer.is_valid(raise_exception=True)
         if request.data.get("password"):
             current_password = request.data.get("current_password")
-            if not check_password(current_password, request.user.password):
+            if not verify_password(current_password, request.user.password):
                 return Response(
                     {"password": ["Invalid password."]},
                     status=status.HTTP_401_UNAUTHORIZED,
@@ -79,8 +80,7 @@ class UserUpdateView(generics.UpdateAPIView, PasswordValidatorMixin):
             response = self.password_validator(request)
             if response:
                 return response
-            password = make_password(request.data.get("password"))
-            self.perform_update(serializer, password=password)
+            self.perform_update(serializer, password=hash_password(request.data.get("password")))
         else:
             self.perform_update(serializer)
 
@@ -101,5 +101,6 @@ class UserDeleteView(generics.DestroyAPIView):
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         instance.is_active = False
+        instance.deactivated_at = timezone.now()
         instance.save()
         return Response(status=status.HTTP_204_NO_CONTENT)